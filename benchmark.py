@@ -0,0 +1,239 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+from chou_reggia_loops import ChouReggiaLoops
+from conway import ConwayCell, GameOfLife
+from eight_puzzle import EightPuzzleCell, EightPuzzleSolver
+from elementary import ElementaryCellularAutomaton
+from ensemble import Ensemble
+from floating_conway import FloatingConway
+from langton_loops import LangtonLoops
+import puzzle_tables
+
+
+def soup(automaton, density=0.3, seed=0):
+    """Activate a random fraction of the cells of a grid automaton."""
+    rng = random.Random(seed)
+    for i in range(automaton.cols):
+        for j in range(automaton.rows):
+            if rng.random() < density:
+                automaton.grid[i][j] = automaton.grid[i][j].activate()
+    return automaton
+
+
+grid_automata = {
+    "conway": lambda size, vectorized: soup(GameOfLife(rows=size, cols=size, vectorized=vectorized, headless=True)),
+    "floating": lambda size, vectorized: FloatingConway(FloatingConway.pattern1, rows=size, cols=size, vectorized=vectorized, headless=True),
+    "langton": lambda size, vectorized: LangtonLoops(rows=size, cols=size, vectorized=vectorized, headless=True),
+    "chou-reggia": lambda size, vectorized: ChouReggiaLoops(rows=size, cols=size, vectorized=vectorized, headless=True),
+}
+
+
+def stepped_cells(automaton):
+    """
+    The number of cells the next step of a grid automaton evaluates, or 0
+    once it has settled: the active cells on the object path (see
+    ``GridAutomaton.update``), or the whole grid on the array path until a
+    step leaves every state unchanged.
+    """
+    cells = automaton.rows * automaton.cols
+    if automaton.vectorized:
+        # The back buffer holds the states before the last step
+        return 0 if np.array_equal(automaton.grid.states, automaton.grid.back) else cells
+    active = automaton.active
+    if active is None or len(active) > automaton.full_sweep_fraction * cells:
+        return cells
+    return len(active)
+
+
+def measure(create, cells, duration):
+    """
+    Measure the throughput of an automaton created by ``create``.
+
+    Only the steps are timed, for at least ``duration`` seconds or until the
+    automaton has settled, as later steps would not exercise the rules.
+    ``cells(automaton)`` is the number of cells the next step evaluates, or
+    0 once the automaton has settled, so cell updates count the cells that
+    were actually updated. Afterwards, the peak memory of creating the
+    automaton and stepping it once more is measured separately, as tracing
+    allocations slows the simulation down.
+    """
+    automaton = create()
+    automaton.step()
+
+    generations = updates = 0
+    elapsed = 0.0
+    count = cells(automaton)
+    while count and elapsed < duration:
+        start = time.perf_counter()
+        automaton.step()
+        elapsed += time.perf_counter() - start
+        generations += 1
+        updates += count
+        count = cells(automaton)
+
+    tracemalloc.start()
+    create().step()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "generations": generations,
+        "settled": not count,
+        "generations_per_second": generations / elapsed if elapsed else 0.0,
+        "cell_updates_per_second": updates / elapsed if elapsed else 0.0,
+        "peak_memory_bytes": peak,
+    }
+
+
+def benchmark_grids(sizes, duration):
+    for name, create in grid_automata.items():
+        for vectorized in [False, True]:
+            engine = "vectorized" if vectorized else "object"
+            for size in sizes:
+                result = measure(lambda: create(size, vectorized), stepped_cells, duration)
+                yield {"name": name, "engine": engine, "size": size, **result}
+
+
+def benchmark_elementary(widths, duration):
+    for width in widths:
+        create = lambda: ElementaryCellularAutomaton(width=width, cols=width, rule=30, headless=True)
+        result = measure(create, lambda automaton: width, duration)
+        yield {"name": "elementary", "engine": "bit-packed", "size": width, **result}
+
+
+def benchmark_ensemble(boards, size, duration):
+    """The throughput of a batch of random Conway boards in board-generations per second."""
+    ensemble = Ensemble.random(ConwayCell, boards, size, size)
+    ensemble.step()
+    start = time.perf_counter()
+    board_generations = ensemble.board_generations
+    while time.perf_counter() - start < duration and ensemble.running:
+        ensemble.step()
+    elapsed = time.perf_counter() - start
+    yield {
+        "name": "ensemble",
+        "engine": "vectorized",
+        "size": size,
+        "boards": boards,
+        "board_generations_per_second": (ensemble.board_generations - board_generations) / elapsed,
+    }
+
+
+def scrambled_puzzle(seed, moves=1000):
+    """A puzzle scrambled by random moves, like ``EightPuzzle.shuffle``."""
+    rng = random.Random(seed)
+    grid = [[EightPuzzleCell(value) for value in column] for column in [[1, 4, 7], [2, 5, 0], [3, 6, 8]]]
+    for _ in range(moves):
+        grid = EightPuzzleSolver.apply_move(grid, rng.choice(EightPuzzleSolver.get_possible_moves(grid)))
+    return SimpleNamespace(grid=grid)
+
+
+def benchmark_eight_puzzle(seeds):
+    """
+    The solve times of the A* search and of the walk down the distance
+    table (see ``EightPuzzleSolver``). The table is built or loaded before
+    the timed solves, so they do not include it.
+    """
+    puzzle_tables.distance_table(3)
+    for engine, tables in [("a-star", False), ("table-walk", True)]:
+        times = []
+        for seed in seeds:
+            solver = EightPuzzleSolver(scrambled_puzzle(seed), tables=tables)
+            start = time.perf_counter()
+            solver.solve()
+            times.append(time.perf_counter() - start)
+        yield {
+            "name": "eight-puzzle",
+            "engine": engine,
+            "size": len(seeds),
+            "mean_solve_seconds": sum(times) / len(times),
+            "max_solve_seconds": max(times),
+        }
+
+
+def key(result):
+    return result["name"], result["engine"], result["size"]
+
+
+def compare(results, previous, tolerance):
+    """
+    Compare the results with a previous run.
+
+    Returns
+    -------
+    list(str)
+        A description of every benchmark that got slower by more than
+        ``tolerance`` (a fraction).
+    """
+    previous = {key(result): result for result in previous["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        if "board_generations_per_second" in result:
+            change = result["board_generations_per_second"] / old["board_generations_per_second"] - 1
+            if change < -tolerance:
+                regressions.append(f"{key(result)}: {change:+.0%} board-generations/s")
+        elif "generations_per_second" in result:
+            if not old["generations_per_second"]:
+                # The automaton settled before the first timed step
+                continue
+            change = result["generations_per_second"] / old["generations_per_second"] - 1
+            if change < -tolerance:
+                regressions.append(f"{key(result)}: {change:+.0%} generations/s")
+        else:
+            change = result["mean_solve_seconds"] / old["mean_solve_seconds"] - 1
+            if change > tolerance:
+                regressions.append(f"{key(result)}: {change:+.0%} solve time")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark all automata without a window.")
+    parser.add_argument("--output", default="benchmark.json", help="file to write the results to")
+    parser.add_argument("--compare", help="results of a previous run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown before flagging a regression")
+    parser.add_argument("--duration", type=float, default=1.0, help="seconds to run each benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[32, 64, 128, 256], help="board sizes, at least 32")
+    parser.add_argument("--widths", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+    parser.add_argument("--boards", type=int, default=1000, help="number of boards of the ensemble benchmark")
+    parser.add_argument("--puzzles", type=int, default=5, help="number of scrambled 8-puzzles to solve")
+    args = parser.parse_args()
+
+    results = []
+    benchmarks = [
+        benchmark_grids(args.sizes, args.duration),
+        benchmark_elementary(args.widths, args.duration),
+        benchmark_ensemble(args.boards, 64, args.duration),
+        benchmark_eight_puzzle(range(args.puzzles)),
+    ]
+    for benchmark in benchmarks:
+        for result in benchmark:
+            print(json.dumps(result))
+            results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "timestamp": time.time(),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "results": results,
+        }, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,199 @@
+import glob
+import json
+import os
+import struct
+
+import numpy as np
+
+from elementary import ElementaryCellularAutomaton, bit_array
+from grid import ArrayGrid, GridAutomaton
+
+
+magic = b"MLCK"
+version = 1
+alignment = 64
+
+
+def write(path, header, states):
+    """
+    Write a checkpoint file.
+
+    The file starts with the magic bytes ``MLCK``, the format version and
+    the length of the header as little-endian ``uint32``, followed by the
+    header as JSON. The states follow as a raw C-order array, aligned to
+    ``alignment`` bytes, so they can be memory-mapped (see ``open_states``).
+    The file is written to a temporary file first and then renamed, so an
+    interrupted write never leaves a broken checkpoint behind.
+
+    Parameters
+    ----------
+    path : str
+        The path of the checkpoint.
+    header : dict
+        Metadata of the checkpoint, e.g. the generation. The type and shape
+        of the states are added automatically.
+    states : np.ndarray
+        The states to store.
+    """
+    states = np.ascontiguousarray(states)
+    header = dict(header, dtype=states.dtype.str, shape=list(states.shape))
+    data = json.dumps(header).encode()
+    prefix = len(magic) + 8
+    padding = -(prefix + len(data)) % alignment
+    data += b" " * padding
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(magic + struct.pack("<II", version, len(data)) + data)
+        states.tofile(f)
+    os.replace(temporary, path)
+
+
+def read_header(path):
+    """
+    The header of a checkpoint file and the offset of its states.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(len(magic) + 8)
+        if prefix[:len(magic)] != magic:
+            raise ValueError(f"{path} is not a checkpoint")
+        file_version, length = struct.unpack("<II", prefix[len(magic):])
+        if file_version != version:
+            raise ValueError(f"Unsupported checkpoint version {file_version}")
+        header = json.loads(f.read(length))
+    return header, len(prefix) + length
+
+
+def open_states(path, mode="r"):
+    """
+    Memory-map the states of a checkpoint, so boards larger than the
+    available memory can be inspected or copied without reading them
+    completely.
+
+    Returns
+    -------
+    tuple(dict, np.memmap)
+        The header and the states.
+    """
+    header, offset = read_header(path)
+    return header, np.memmap(path, dtype=np.dtype(header["dtype"]), mode=mode,
+                             offset=offset, shape=tuple(header["shape"]))
+
+
+def save(automaton, path, generation=0):
+    """
+    Save the state of a grid automaton or an elementary automaton.
+
+    Grids are stored as their array of states, together with the cell type,
+    its rule (see ``GridCell.rule_parameters``) and the neighbourhood.
+    Elementary automata are stored bit-packed, together with the rule.
+    """
+    header = {"automaton": type(automaton).__name__, "generation": generation}
+    if isinstance(automaton, ElementaryCellularAutomaton):
+        header.update(rule=automaton.rule, width=automaton.cols)
+        states = np.packbits(bit_array(automaton.bits, automaton.cols), bitorder="little")
+    elif isinstance(automaton, GridAutomaton):
+        neighbourhood = automaton.neighbourhood
+        header.update(
+            cell_type=automaton.cell_type.__name__,
+            rule=automaton.cell_type.rule_parameters(),
+            neighbourhood={
+                "type": neighbourhood.type.name,
+                "radius": neighbourhood.radius,
+                "positional": neighbourhood.positional,
+            },
+        )
+        states = automaton.grid.states if isinstance(automaton.grid, ArrayGrid) else automaton.snapshot()
+    else:
+        raise TypeError(f"Cannot checkpoint {type(automaton).__name__}")
+    write(path, header, states)
+
+
+def load(automaton, path):
+    """
+    Restore the state of an automaton saved with ``save``. The automaton
+    must be of the same type and size as the saved one, with the same cell
+    type, rule and neighbourhood.
+
+    Returns
+    -------
+    int
+        The generation of the checkpoint.
+    """
+    header, states = open_states(path)
+    if header["automaton"] != type(automaton).__name__:
+        raise ValueError(f"Checkpoint of a {header['automaton']}, not a {type(automaton).__name__}")
+
+    if isinstance(automaton, ElementaryCellularAutomaton):
+        if header["width"] != automaton.cols:
+            raise ValueError(f"Checkpoint of width {header['width']}, not {automaton.cols}")
+        automaton.rule = header["rule"]
+        automaton.set_bits(int.from_bytes(np.asarray(states).tobytes(), "little"))
+    else:
+        if tuple(header["shape"]) != (automaton.cols, automaton.rows):
+            raise ValueError(f"Checkpoint of shape {tuple(header['shape'])}, not {(automaton.cols, automaton.rows)}")
+        cell_type = automaton.cell_type
+        if header["cell_type"] != cell_type.__name__:
+            raise ValueError(f"Checkpoint of {header['cell_type']} cells, not {cell_type.__name__}")
+        # Round trip through JSON, so that e.g. tuples compare equal to the lists read back
+        rule = json.loads(json.dumps(cell_type.rule_parameters()))
+        if header.get("rule") != rule:
+            raise ValueError(f"Checkpoint with the rule {header.get('rule')}, not {rule}")
+        neighbourhood = automaton.neighbourhood
+        if (header["neighbourhood"]["type"], header["neighbourhood"]["radius"]) != (neighbourhood.type.name, neighbourhood.radius):
+            raise ValueError(f"Checkpoint with a different neighbourhood: {header['neighbourhood']}")
+        if isinstance(automaton.grid, ArrayGrid):
+            np.copyto(automaton.grid.states, states, casting="unsafe")
+        else:
+            automaton.grid = ArrayGrid(automaton.cell_type, *states.shape, states=np.array(states)).to_cells()
+        automaton.active = None
+        if automaton.zobrist is not None:
+            automaton.zobrist.invalidate()
+    return header["generation"]
+
+
+class Checkpointer:
+    """
+    Periodically saves checkpoints of a headless run into a directory.
+
+    Checkpoints are named after their generation, and only the latest
+    ``keep`` checkpoints are kept.
+
+    Example
+    -------
+    >>> checkpointer = Checkpointer("checkpoints", every=10_000)
+    >>> start = checkpointer.resume(life)
+    >>> for generation, states in runner.run(life, 1_000_000, start=start, checkpointer=checkpointer):
+    >>>     ...
+    """
+    def __init__(self, directory, every=1000, keep=2):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+
+    def path(self, generation):
+        return os.path.join(self.directory, f"generation_{generation:012d}.ckpt")
+
+    def checkpoints(self):
+        """The paths of all checkpoints, oldest first."""
+        return sorted(glob.glob(os.path.join(self.directory, "generation_*.ckpt")))
+
+    def save(self, automaton, generation):
+        os.makedirs(self.directory, exist_ok=True)
+        save(automaton, self.path(generation), generation)
+        for path in self.checkpoints()[:-self.keep]:
+            os.remove(path)
+
+    def resume(self, automaton):
+        """
+        Load the latest checkpoint into the automaton, if there is one.
+
+        Returns
+        -------
+        int
+            The generation to continue from, or 0 without a checkpoint.
+        """
+        checkpoints = self.checkpoints()
+        if not checkpoints:
+            return 0
+        return load(automaton, checkpoints[-1])
@@ -1,7 +1,12 @@
+import numpy as np
+
 from grid import GridCell, GridAutomaton
 
 
 class ConwayCell(GridCell):
+
+    __slots__ = ("alive",)
+    dtype = np.bool_
     
     def __init__(self, alive=False):
         self.alive = alive
@@ -17,6 +22,21 @@ class ConwayCell(GridCell):
 
     def activate(self):
         return ConwayCell(True)
+
+    def to_state(self):
+        return self.alive
+
+    @staticmethod
+    def step_states(alive, neighbourhood, out=None):
+        if out is None:
+            out = np.empty_like(alive)
+        count = neighbourhood.sum(alive, out=neighbourhood.buffer("count", alive.shape, neighbourhood.sum_dtype(alive.dtype)))
+        survive = neighbourhood.buffer("survive", alive.shape, np.bool_)
+
+        np.equal(count, 3, out=out)
+        np.equal(count, 2, out=survive)
+        np.logical_and(survive, alive, out=survive)
+        return np.logical_or(out, survive, out=out)
         
     @property
     def color(self):
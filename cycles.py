@@ -0,0 +1,149 @@
+from collections import deque
+
+import numpy as np
+
+
+def state_bits(states):
+    """
+    The states of a grid as unsigned 64-bit integers, so that equal states,
+    including floating point states, map to equal integers.
+    """
+    states = np.ascontiguousarray(states)
+    if np.issubdtype(states.dtype, np.floating):
+        states = states + 0.0  # Map -0.0 to 0.0
+        states = states.view(f"u{states.dtype.itemsize}")
+    return states.astype(np.uint64)
+
+
+def mix(values):
+    """The SplitMix64 finalizer, applied elementwise to a uint64 array."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class ZobristHash:
+    """
+    A Zobrist hash of a grid of states that is updated in place when cells
+    change.
+
+    Every cell position has a random 64-bit key. The contribution of a cell
+    is its key mixed with its state, and the hash is the XOR of all
+    contributions. Changing a cell only XORs out its old contribution and
+    XORs in the new one, so updating the hash costs time proportional to
+    the number of changed cells rather than the size of the grid.
+
+    Mixing the state into the key instead of drawing one key per state
+    supports any number of states, including floating point activations.
+    For boolean states, the contributions of both states of every cell are
+    tabulated on first use, as in a classic Zobrist table.
+
+    Parameters
+    ----------
+    size : int
+        The number of cells.
+    seed : int, optional
+        The seed of the keys. Hashes are only comparable between grids with
+        the same size and seed. Default is 0.
+    """
+    def __init__(self, size, seed=0):
+        rng = np.random.default_rng(seed)
+        self.keys = rng.integers(0, 2 ** 64, size, dtype=np.uint64, endpoint=False)
+        self.value = None
+        self.table = None
+
+    def contributions(self, positions, states):
+        states = np.asarray(states)
+        if states.dtype == np.bool_:
+            if self.table is None:
+                self.table = mix(self.keys[:, None] ^ mix(np.arange(2, dtype=np.uint64)))
+            return self.table[positions, states.view(np.uint8)]
+        return mix(self.keys[positions] ^ mix(state_bits(states)))
+
+    def reset(self, states):
+        """Compute the hash of a whole grid of states from scratch."""
+        states = np.asarray(states).ravel()
+        self.value = int(np.bitwise_xor.reduce(self.contributions(np.arange(states.size), states)))
+        return self.value
+
+    def update(self, positions, old, new):
+        """
+        Update the hash for the cells at the flat ``positions`` that changed
+        from the ``old`` to the ``new`` states.
+        """
+        if self.value is None or len(positions) == 0:
+            return self.value
+        positions = np.asarray(positions, dtype=np.intp)
+        changes = self.contributions(positions, old) ^ self.contributions(positions, new)
+        self.value ^= int(np.bitwise_xor.reduce(changes))
+        return self.value
+
+    def invalidate(self):
+        """Mark the hash as out of date, e.g. after the grid was edited."""
+        self.value = None
+
+
+class CycleDetector:
+    """
+    Detects fixed points and cycles from the hashes of recent generations.
+
+    The hashes of the last ``history`` generations are kept in a ring
+    buffer and indexed by value, so each generation is checked in constant
+    time. A cycle is detected as soon as a hash repeats, which finds every
+    cycle with a period of at most ``history`` generations. A fixed point is
+    a cycle of period 1.
+
+    As only hashes are compared, two different states could in principle
+    be mistaken for each other. With 64-bit hashes this is vanishingly
+    unlikely for any practical history length.
+
+    Attributes
+    ----------
+    start : int
+        The first generation of the detected cycle, or None.
+    period : int
+        The period of the detected cycle, or None.
+    """
+    def __init__(self, history=1000):
+        self.history = deque(maxlen=history)
+        self.index = {}
+        self.start = None
+        self.period = None
+
+    def observe(self, generation, value):
+        """
+        Record the hash of a generation.
+
+        Returns
+        -------
+        int
+            The period if the state of this generation was seen before,
+            otherwise None.
+        """
+        if value is None:
+            return None
+        seen = self.index.get(value)
+        if seen is not None:
+            self.start, self.period = seen, generation - seen
+            return self.period
+
+        if len(self.history) == self.history.maxlen:
+            old_generation, old_value = self.history[0]
+            if self.index.get(old_value) == old_generation:
+                del self.index[old_value]
+        self.history.append((generation, value))
+        self.index[value] = generation
+        return None
+
+    def converged(self, generation):
+        """Record that the automaton reached a fixed point by some other test."""
+        self.start, self.period = generation, 1
+        return self.period
+
+    def reset(self):
+        self.history.clear()
+        self.index.clear()
+        self.start = None
+        self.period = None
@@ -1,10 +1,76 @@
-from tkinter import *
-from PIL import Image, ImageGrab
+from functools import lru_cache
+from PIL import Image, ImageColor, ImageGrab
+import numpy as np
 import os
 
+from profiling import Profiler
+from worker import SimulationWorker
+
+
+@lru_cache(maxsize=None)
+def to_rgb(color):
+    """Convert a Tk colour (e.g. "light gray" or "#2F2F2F") to an RGB tuple."""
+    return ImageColor.getrgb(color.replace(" ", ""))
+
+
+def render_grid(colors, cell_size, line_color=None):
+    """
+    Render a grid of cell colours into an image.
+
+    Parameters
+    ----------
+    colors : np.ndarray
+        The RGB colour of every cell as an array of shape (cols, rows, 3).
+    cell_size : int
+        The size of each cell in pixels.
+    line_color : str, optional
+        The colour of the grid lines. Default is None, which draws no lines.
+        Lines are also left out for cells smaller than 3 pixels, which they
+        would cover completely.
+
+    Returns
+    -------
+    Image
+        The rendered grid.
+    """
+    colors = np.asarray(colors, dtype=np.uint8).transpose(1, 0, 2)
+    pixels = np.repeat(np.repeat(colors, cell_size, axis=0), cell_size, axis=1)
+    if line_color and cell_size > 2:
+        rows, cols = colors.shape[:2]
+        lined = np.empty((rows * cell_size + 1, cols * cell_size + 1, 3), dtype=np.uint8)
+        lined[:-1, :-1] = pixels
+        lined[::cell_size, :] = to_rgb(line_color)
+        lined[:, ::cell_size] = to_rgb(line_color)
+        pixels = lined
+    return Image.fromarray(pixels)
+
+
 class Container:
+    """
+    A window with a canvas that is redrawn at a fixed frame rate.
+
+    By default, the canvas is cleared before every call to ``draw``.
+    Subclasses that update their canvas items in place set
+    ``clear_canvas`` to False.
+
+    Automata that track changes between generations set ``last_change`` to
+    the largest change of a cell state in the last step.
+
+    Every container has a ``profiler`` (see ``profiling.Profiler``) that
+    times the phases of every frame if the container was created with
+    ``profile=True``.
 
-    def __init__(self, width, height, frame_rate=5, gif_path=None, gif_length=100):
+    With ``threaded=True``, the simulation is advanced by a
+    ``worker.SimulationWorker`` on a background thread, and ``draw`` shows
+    the latest published frame, ``frame``, instead of stepping. Subclasses
+    pass user edits through ``edit``, so the worker applies them between
+    two steps.
+    """
+    clear_canvas = True
+    last_change = None
+
+    def __init__(self, width, height, frame_rate=5, gif_path=None, gif_length=100, headless=False, profile=False,
+                 threaded=False, render_every=1, fast=False):
         """
         Create a container to draw on.
 
@@ -20,43 +86,86 @@ class Container:
             The path to save the container as a gif. Default is None.
         gif_length : int, optional
             The number of frames of the gif. Default is 100.
+        headless : bool, optional
+            Whether to run without a window. A headless container only runs
+            ``setup`` and is then advanced by calling ``step``, e.g. through
+            ``runner.run``. Tkinter is not imported. Default is False.
+        profile : bool, optional
+            Whether to record the duration of every frame and its phases in
+            ``profiler``. In a window, the statistics are shown in an
+            overlay in the top left corner. Default is False.
+        threaded : bool, optional
+            Whether to advance the simulation on a background thread, so
+            it is not limited by the frame rate and a slow step does not
+            block the window. Ignored when headless. Default is False.
+        render_every : int, optional
+            With ``threaded``, show only every ``render_every``-th
+            generation. Default is 1.
+        fast : bool, optional
+            With ``threaded``, run as fast as possible and show only the
+            latest generation in every frame. Default is False.
         """
         self.width = width
         self.height = height
         self.frame_rate = frame_rate
+        self.profiler = Profiler(enabled=profile, budget=1 / frame_rate if not headless else None)
+        self.overlay_item = None
+        self.worker = None
+        self.frame = None
 
+        self.gif_path = gif_path
         if gif_path:
-            self.gif_path = gif_path
             self.gif_length = gif_length
             self.gif_frames = []
 
             if os.path.exists(gif_path):
                 os.remove(gif_path)
 
+        self.headless = headless
+        if headless:
+            self.root = None
+            self.canvas = None
+            self.setup()
+            return
+
+        from tkinter import Tk, Canvas
+
         self.root = Tk()
         self.canvas = Canvas(self.root, width=self.width, height=self.height)
         self.canvas.pack()
         self.setup()
 
+        if threaded:
+            self.worker = SimulationWorker(self, every=render_every, fast=fast)
+            self.worker.start()
+
         def _draw():
-            self.canvas.delete("all")
-            self.draw()
-
-            if gif_path and len(self.gif_frames) < self.gif_length:
-                self.gif_frames.append(self.capture_frame())
-
-                if len(self.gif_frames) == self.gif_length:
-                    self.gif_frames[1].save(
-                        self.gif_path,
-                        save_all=True,
-                        append_images=self.gif_frames[1:],
-                        duration=100,
-                        loop=0
-                    )
+            if self.worker is not None:
+                # Only redraw when the worker published a new frame
+                frame = self.worker.latest()
+                if frame is None:
+                    self.root.after(int(1000 / self.frame_rate), _draw)
+                    return
+                self.frame = frame[1]
+            self.profiler.begin_frame()
+            if self.clear_canvas:
+                self.canvas.delete("all")
+                self.overlay_item = None
+            if self.worker is None:
+                # The worker records the frames of a threaded container
+                with self.profiler.phase("capture"):
+                    self.record_frame()
+            with self.profiler.phase("draw"):
+                self.draw()
+            self.profiler.end_frame()
+            if self.profiler.enabled:
+                self.draw_overlay()
             self.root.after(int(1000 / self.frame_rate), _draw)
         self.root.after(0, _draw)
 
         def _shutdown():
+            if self.worker is not None:
+                self.worker.stop()
             self.shutdown()
             self.root.destroy()
         self.root.protocol("WM_DELETE_WINDOW", _shutdown)
@@ -75,6 +184,48 @@ class Container:
         """Override this method to perform actions before the window is closed."""
         pass
 
+    def step(self, _=None):
+        """Override this method to advance the simulation by one generation."""
+        pass
+
+    def snapshot(self):
+        """Override this method to return a copy of the current simulation state."""
+        pass
+
+    def frame_state(self):
+        """
+        Override this method to return a copy of what ``draw`` shows, which
+        the worker of a threaded container publishes as ``frame``. Default
+        is ``snapshot()``.
+        """
+        return self.snapshot()
+
+    def edit(self, callback, *args):
+        """
+        Apply a user edit by calling ``callback(*args)``. In a threaded
+        container, the worker calls it between two steps instead.
+        """
+        if self.worker is not None:
+            self.worker.submit(lambda: callback(*args))
+        else:
+            callback(*args)
+
+    def state_hash(self):
+        """
+        Override this method to return a 64-bit hash of the current state
+        (see ``cycles.ZobristHash``), or None if the state cannot be hashed.
+        """
+        return None
+
+    def draw_overlay(self):
+        """Show the statistics of the profiler on top of the canvas."""
+        if self.overlay_item is None:
+            self.overlay_item = self.canvas.create_text(
+                5, 5, anchor="nw", fill="#FF4040", font=("Courier", 9), text=""
+            )
+        self.canvas.itemconfig(self.overlay_item, text=self.profiler.overlay_text())
+        self.canvas.tag_raise(self.overlay_item)
+
     def bind(self, event, callback):
         """
         Bind an event to a callback.
@@ -95,7 +246,8 @@ class Container:
         >>> container = Container(500, 500)
         >>> container.bind("<Button-1>", left_click)
         """
-        self.root.bind(event, callback)
+        if self.root is not None:
+            self.root.bind(event, callback)
 
     def draw_grid(self, cols, rows, cell_size, color="light gray", linewidth=1):
         """
@@ -114,6 +266,10 @@ class Container:
         linewidth : int, optional
             The width of the grid lines. Default is 1.
         """
+        with self.profiler.phase("grid"):
+            self._draw_grid(cols, rows, cell_size, color, linewidth)
+
+    def _draw_grid(self, cols, rows, cell_size, color, linewidth):
         if type(cell_size) == int:
             cell_size = (cell_size, cell_size)
 
@@ -128,6 +284,36 @@ class Container:
                                     cols * cell_size[0], j * cell_size[1],
                                     fill=color, width=linewidth)
             
+    def record_frame(self):
+        """
+        Add the current frame to the gif and save the gif once it has
+        ``gif_length`` frames. Does nothing without a ``gif_path``.
+        """
+        if not self.gif_path or len(self.gif_frames) >= self.gif_length:
+            return
+
+        self.gif_frames.append(self.render_frame())
+        if len(self.gif_frames) == self.gif_length:
+            self.gif_frames[0].save(
+                self.gif_path,
+                save_all=True,
+                append_images=self.gif_frames[1:],
+                duration=100,
+                loop=0
+            )
+
+    def render_frame(self):
+        """
+        Override this method to render the current frame into an image
+        without a window. By default, the frame is captured from the screen.
+
+        Returns
+        -------
+        Image
+            The current frame.
+        """
+        return self.capture_frame()
+
     def capture_frame(self):
         """
         Capture the current frame of the canvas.
@@ -1,11 +1,16 @@
 from grid import GridAutomaton, GridCell
 from warnings import warn
 from random import choice
+import heapq
+
+import puzzle_tables
 
 class EightPuzzleCell(GridCell):
     """
     A cell for the 8-puzzle game.
     """
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
@@ -25,16 +30,19 @@ class EightPuzzleCell(GridCell):
         
 
 class EightPuzzle(GridAutomaton):
-
-    def __init__(self, **kwargs):
-        super().__init__(EightPuzzleCell, rows=3, cols=3, frame_rate=1, **kwargs)
+    """
+    The 8-puzzle, or with ``size=4`` the 15-puzzle etc. The board is
+    shuffled and then solved optimally, one move per frame.
+    """
+    def __init__(self, size=3, **kwargs):
+        self.size = size
+        super().__init__(EightPuzzleCell, rows=size, cols=size, frame_rate=1, **kwargs)
 
     def setup(self):
 
         self.grid = [
-            [EightPuzzleCell(1), EightPuzzleCell(2), EightPuzzleCell(3)],
-            [EightPuzzleCell(4), EightPuzzleCell(5), EightPuzzleCell(6)],
-            [EightPuzzleCell(7), EightPuzzleCell(0), EightPuzzleCell(8)],
+            [EightPuzzleCell((y * self.size + x + 1) % (self.size * self.size)) for x in range(self.size)]
+            for y in range(self.size)
         ]
         self.grid = list(map(list, zip(*self.grid)))
 
@@ -45,7 +53,7 @@ class EightPuzzle(GridAutomaton):
         self.move_idx = 0
 
     def update(self):
-        if self.solver.solution:
+        if self.solver.solution is not None:
             if self.move_idx < len(self.solver):
                 move = self.solver[self.move_idx]
                 self.grid = EightPuzzleSolver.apply_move(self.grid, move)
@@ -66,30 +74,241 @@ class EightPuzzle(GridAutomaton):
                 
 
 class EightPuzzleSolver:
-    def __init__(self, puzzle):
+    """
+    An optimal solver for sliding puzzles of any size (the 8-puzzle, the
+    15-puzzle, ...).
+
+    States are packed into integers with ``bits`` bits per board position in
+    reading order. Boards of size 3 are solved with A*, larger boards with
+    IDA*, both guided by the Manhattan distance plus linear conflicts, which
+    are updated incrementally for every move.
+
+    With ``tables=True``, the 8-puzzle is instead solved by walking down the
+    precomputed table of distances of all boards, and the IDA* search of
+    the 15-puzzle additionally uses additive pattern databases (see
+    ``puzzle_tables``). The tables are built on first use and then loaded
+    from disk.
+
+    The solution is a list of moves of the empty cell, as used by
+    ``apply_move``.
+    """
+    def __init__(self, puzzle, tables=True):
         self.puzzle = puzzle
+        self.tables = tables
+        self.size = len(puzzle.grid)
+        self.bits = max(1, (self.size * self.size - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.goal = self.pack(list(range(1, self.size * self.size)) + [0])
+        self.conflicts = {}
         self.reset()
 
     def reset(self):
-        self.queue = [([], self.puzzle.grid)]
-        self.visited = set()
         self.solution = None
+        self.expanded = 0
 
     def solve(self):
-        while self.queue:
-            path, grid = self.queue.pop(0)
-            if self.is_solved(grid):
-                self.solution = path
-                return
-            self.visited.add(self.grid_to_string(grid))
-            for move in self.get_possible_moves(grid):
-                new_grid = self.apply_move(grid, move)
-                if self.grid_to_string(new_grid) not in self.visited:
-                    self.queue.append((path + [move], new_grid))
+        tiles = self.grid_to_tiles(self.puzzle.grid)
+        self.reset()
+        if not self.is_solvable(tiles):
+            return
+        if self.size == 3 and self.tables:
+            self.solution = self.table_walk(tiles, puzzle_tables.distance_table(self.size))
+        elif self.size <= 3:
+            self.solution = self.a_star(tiles)
+        elif self.size in puzzle_tables.default_patterns and self.tables:
+            self.solution = self.ida_star(tiles, puzzle_tables.pattern_databases(self.size))
+        else:
+            self.solution = self.ida_star(tiles)
+
+    def table_walk(self, tiles, table):
+        """Follow moves that decrease the distance in a table of all boards."""
+        path = []
+        distance = table[puzzle_tables.rank(tiles)]
+        while distance:
+            for move, board in puzzle_tables.moves(tiles, self.size):
+                if table[puzzle_tables.rank(board)] == distance - 1:
+                    path.append(move)
+                    tiles = board
+                    distance -= 1
+                    break
+        return path
 
     def is_solved(self, grid):
-        return self.grid_to_string(grid) == "123456780"
+        return self.pack(self.grid_to_tiles(grid)) == self.goal
+
+    def pack(self, tiles):
+        state = 0
+        for position, tile in enumerate(tiles):
+            state |= tile << (self.bits * position)
+        return state
+
+    def tile_at(self, state, position):
+        return (state >> (self.bits * position)) & self.mask
+
+    def grid_to_tiles(self, grid):
+        return [grid[x][y].value for y in range(self.size) for x in range(self.size)]
+
+    def is_solvable(self, tiles):
+        numbers = [tile for tile in tiles if tile]
+        inversions = sum(a > b for i, a in enumerate(numbers) for b in numbers[i + 1:])
+        if self.size % 2:
+            return inversions % 2 == 0
+        blank_row_from_bottom = self.size - tiles.index(0) // self.size
+        return (inversions + blank_row_from_bottom) % 2 == 1
+
+    def distance(self, tile, position):
+        """The Manhattan distance of ``tile`` at ``position`` from its goal."""
+        goal = tile - 1
+        return abs(goal % self.size - position % self.size) + abs(goal // self.size - position // self.size)
+
+    def line_conflicts(self, tiles, line, vertical):
+        """
+        The linear conflict penalty of a row (or column if ``vertical``):
+        two moves for every tile that has to leave its goal line to let
+        another tile in the same line pass.
+        """
+        if vertical:
+            key = (tuple(tiles[line::self.size]), line, vertical)
+        else:
+            key = (tuple(tiles[line * self.size:(line + 1) * self.size]), line, vertical)
+        conflicts = self.conflicts.get(key)
+        if conflicts is None:
+            conflicts = self.conflicts[key] = self.count_line_conflicts(*key)
+        return conflicts
 
+    def count_line_conflicts(self, line_tiles, line, vertical):
+        if vertical:
+            goals = [(tile - 1) // self.size for tile in line_tiles if tile and (tile - 1) % self.size == line]
+        else:
+            goals = [(tile - 1) % self.size for tile in line_tiles if tile and (tile - 1) // self.size == line]
+
+        # Tiles that have to move out of the line are those not in the
+        # longest increasing subsequence of goal positions
+        longest = [1] * len(goals)
+        for i in range(len(goals)):
+            for j in range(i):
+                if goals[j] < goals[i]:
+                    longest[i] = max(longest[i], longest[j] + 1)
+        return 2 * (len(goals) - max(longest, default=0))
+
+    def heuristic(self, tiles):
+        manhattan = sum(self.distance(tile, position) for position, tile in enumerate(tiles) if tile)
+        conflicts = sum(self.line_conflicts(tiles, line, vertical)
+                        for line in range(self.size) for vertical in (False, True))
+        return manhattan + conflicts
+
+    def neighbours(self, tiles, blank):
+        """
+        The moves from a board, as tuples of (move, blank position, change
+        in heuristic). ``tiles`` is left as it was.
+        """
+        x, y = blank % self.size, blank // self.size
+        for move in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            new_x, new_y = x + move[0], y + move[1]
+            if not (0 <= new_x < self.size and 0 <= new_y < self.size):
+                continue
+            target = new_y * self.size + new_x
+            tile = tiles[target]
+            vertical = move[0] != 0
+            line = (x, new_x) if vertical else (y, new_y)
+
+            before = self.line_conflicts(tiles, line[0], vertical) + self.line_conflicts(tiles, line[1], vertical)
+            tiles[blank], tiles[target] = tile, 0
+            after = self.line_conflicts(tiles, line[0], vertical) + self.line_conflicts(tiles, line[1], vertical)
+            tiles[blank], tiles[target] = 0, tile
+
+            delta = self.distance(tile, blank) - self.distance(tile, target) + after - before
+            yield move, target, delta
+
+    def a_star(self, tiles):
+        start = self.pack(tiles)
+        parents = {start: None}
+        costs = {start: 0}
+        queue = [(self.heuristic(tiles), 0, start, tiles.index(0), self.heuristic(tiles))]
+        while queue:
+            _, g, state, blank, h = heapq.heappop(queue)
+            if state == self.goal:
+                return self.reconstruct(parents, state)
+            if g > costs[state]:
+                continue
+            self.expanded += 1
+
+            tiles = [self.tile_at(state, p) for p in range(self.size * self.size)]
+            for move, target, delta in self.neighbours(tiles, blank):
+                tile = tiles[target]
+                child = state ^ (tile << (self.bits * target)) ^ (tile << (self.bits * blank))
+                if g + 1 < costs.get(child, g + 2):
+                    costs[child] = g + 1
+                    parents[child] = (state, move)
+                    heapq.heappush(queue, (g + 1 + h + delta, g + 1, child, target, h + delta))
+
+    def reconstruct(self, parents, state):
+        path = []
+        while parents[state] is not None:
+            state, move = parents[state]
+            path.append(move)
+        return path[::-1]
+
+    def ida_star(self, tiles, databases=()):
+        path = []
+        blank = tiles.index(0)
+        h = bound = self.heuristic(tiles)
+
+        # The pattern database index of every database, the index weight of
+        # the empty cell in every database and the database and index
+        # weight of every tile in a pattern
+        cells = self.size * self.size
+        indices = [sum(tiles.index(tile) * cells ** i for i, tile in enumerate(pattern)) + blank * cells ** len(pattern)
+                   for pattern, _ in databases]
+        blank_weights = [cells ** len(pattern) for pattern, _ in databases]
+        weights = {tile: (d, cells ** i) for d, (pattern, _) in enumerate(databases) for i, tile in enumerate(pattern)}
+        tables = [table for _, table in databases]
+
+        def move_blank(distance, tile):
+            for d, blank_weight in enumerate(blank_weights):
+                indices[d] += distance * blank_weight
+            d, weight = weights.get(tile, (None, 0))
+            if d is not None:
+                indices[d] -= distance * weight
+
+        def pattern_heuristic():
+            return sum(int(table[index]) for table, index in zip(tables, indices))
+
+        bound = max(bound, pattern_heuristic())
+
+        def search(g, blank, h, previous):
+            f = g + max(h, pattern_heuristic()) if tables else g + h
+            if f > bound:
+                return f
+            if h == 0:
+                return True
+            self.expanded += 1
+            minimum = float("inf")
+            for move, target, delta in list(self.neighbours(tiles, blank)):
+                if previous and move == (-previous[0], -previous[1]):
+                    continue
+                tile = tiles[target]
+                tiles[blank], tiles[target] = tile, 0
+                if tables:
+                    move_blank(target - blank, tile)
+                path.append(move)
+                result = search(g + 1, target, h + delta, move)
+                if result is True:
+                    return True
+                path.pop()
+                tiles[target], tiles[blank] = tile, 0
+                if tables:
+                    move_blank(blank - target, tile)
+                minimum = min(minimum, result)
+            return minimum
+
+        while True:
+            result = search(0, blank, h, None)
+            if result is True:
+                return path
+            if result == float("inf"):
+                return None
+            bound = result
 
     @staticmethod
     def apply_move(grid, move):
@@ -97,7 +316,7 @@ class EightPuzzleSolver:
         new_x, new_y = x + move[0], y + move[1]
         new_grid = [row[:] for row in grid]
         
-        if 0 <= new_x < 3 and 0 <= new_y < 3:
+        if 0 <= new_x < len(grid) and 0 <= new_y < len(grid):
             new_grid[x][y], new_grid[new_x][new_y] = new_grid[new_x][new_y], new_grid[x][y]
         else:
             warn("Invalid move")
@@ -110,11 +329,11 @@ class EightPuzzleSolver:
         moves = []
         if x > 0:
             moves.append((-1, 0))
-        if x < 2:
+        if x < len(grid) - 1:
             moves.append((1, 0))
         if y > 0:
             moves.append((0, -1))
-        if y < 2:
+        if y < len(grid) - 1:
             moves.append((0, 1))
         return moves
     
@@ -125,14 +344,6 @@ class EightPuzzleSolver:
                 if cell.value == 0:
                     return x, y
 
-    def grid_to_string(self, grid):
-        rep = ""
-        for x, row in enumerate(grid):
-            for y, cell in enumerate(row):
-                rep += str(grid[y][x].value)
-        return rep
-
-
     def __len__(self):
         return len(self.solution)
 
@@ -1,6 +1,65 @@
-from drawing import Container
+from cycles import ZobristHash
+from drawing import Container, render_grid, to_rgb
+from spacetime import RowRing, SpacetimeFile
 from warnings import warn
 
+import numpy as np
+
+
+def pack_row(cells):
+    """Pack a list of 0/1 cells into an integer, with cell ``i`` at bit ``i``."""
+    return int("".join(map(str, reversed(cells))) or "0", 2)
+
+
+def unpack_row(bits, width):
+    """Unpack an integer into a list of ``width`` 0/1 cells."""
+    return [int(bit) for bit in reversed(bin(bits)[2:].zfill(width)[-width:])]
+
+
+def bit_array(bits, width):
+    """Unpack an integer into a boolean array of ``width`` cells."""
+    data = np.frombuffer(bits.to_bytes((width + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(data, bitorder="little")[:width].astype(np.bool_)
+
+
+def step_row(bits, width, rule):
+    """
+    Compute the next row of an elementary cellular automaton on a ring.
+
+    The row is stored as a single integer with cell ``i`` at bit ``i``, so a
+    generation takes a few dozen shift and logic operations on the whole
+    row instead of one rule lookup per cell.
+
+    Parameters
+    ----------
+    bits : int
+        The current row.
+    width : int
+        The number of cells in the row.
+    rule : int
+        The rule number (0 to 255).
+
+    Returns
+    -------
+    int
+        The next row.
+    """
+    mask = (1 << width) - 1
+    left = ((bits << 1) | (bits >> (width - 1))) & mask
+    right = (bits >> 1) | ((bits & 1) << (width - 1))
+
+    # Bit k of the rule is the new state of neighbourhoods reading k in binary
+    neighbours = [(right ^ mask, right), (bits ^ mask, bits), (left ^ mask, left)]
+    pairs = {}
+    next_bits = 0
+    for k in range(8):
+        if rule >> k & 1:
+            pair = pairs.get(k >> 1)
+            if pair is None:
+                pair = pairs[k >> 1] = neighbours[2][k >> 2] & neighbours[1][k >> 1 & 1]
+            next_bits |= pair & neighbours[0][k & 1]
+    return next_bits
+
 class ElementaryCellularAutomaton(Container):
     """
     The simplest class of one-dimensional cellular automata.
@@ -21,9 +80,16 @@ class ElementaryCellularAutomaton(Container):
     - The top row is the initial state of the grid.
     - At each step, the next row is calculated based on the previous row.
 
+    The state is stored bit-packed in ``bits`` and advanced with
+    ``step_row``, so very wide rows can be run headless. The rows on screen
+    are kept in a ``RowRing``, and with ``history_path`` every row is also
+    appended to a ``SpacetimeFile``, which is closed by ``shutdown``.
+
     Source: https://en.wikipedia.org/wiki/Elementary_cellular_automaton
     """
-    def __init__(self, width=810, height=600, cols=81, rule=22, start_pattern=[1], **kwargs):
+    clear_canvas = False
+
+    def __init__(self, width=810, height=600, cols=81, rule=22, start_pattern=[1], history_path=None, **kwargs):
         self.cols = cols
         self.cell_size = width // self.cols
         self.rows = height // self.cell_size
@@ -37,65 +103,131 @@ class ElementaryCellularAutomaton(Container):
             self.start_pattern = start_pattern
 
         self.running = True 
+        self.zobrist = None
+        self.history_path = history_path
+        self.history_file = None
+        self.cell_items = None
 
         super().__init__(width, height, **kwargs)
 
     def setup(self):
-        self.state = [0] * self.cols
-
         start_offset = (self.cols - len(self.start_pattern)) // 2
-        self.state[start_offset:start_offset + len(self.start_pattern)] = self.start_pattern
-
-        self.history = [self.state] 
-
-        self.ruleset = [int(bit) for bit in bin(self.rule)[2:].zfill(8)]
-
-        self.bind("<Button-1>", self.on_click)
-        self.bind("<Button-3>", self.clear)
-        self.bind("<Button-2>", self.step)
+        self.history = RowRing(self.rows, self.cols)
+        if self.history_path:
+            self.history_file = SpacetimeFile(self.history_path, "w", width=self.cols, rule=self.rule)
+        self.set_bits(pack_row(self.start_pattern) << start_offset)
+
+        self.bind("<Button-1>", lambda event: self.edit(self.on_click, event))
+        self.bind("<Button-3>", lambda event: self.edit(self.clear, event))
+        self.bind("<Button-2>", lambda event: self.edit(self.step))
         self.bind("<space>", self.pause)      
 
     def draw(self):
-        self.draw_grid(self.cols, self.rows, self.cell_size)
-        for j, state in enumerate(self.history):
-            for i, cell in enumerate(state):
-                if cell == 1:
-                    self.canvas.create_rectangle(
-                        i * self.cell_size,
-                        j * self.cell_size,
-                        (i + 1) * self.cell_size,
-                        (j + 1) * self.cell_size,
-                        fill="black",
-                    )
-        if self.running:
+        if self.cell_items is None:
+            self.create_items()
+
+        history = self.history.cells() if self.worker is None else self.frame
+        cells = np.zeros((self.rows, self.cols), dtype=np.bool_)
+        cells[:len(history)] = history
+        for j, i in zip(*np.nonzero(cells != self.drawn_cells)):
+            color = "black" if cells[j, i] else ""
+            self.canvas.itemconfig(self.cell_items[j][i], fill=color, outline=color)
+        self.drawn_cells = cells
+
+        if self.running and self.worker is None:
             self.step()
-    
+
+    def create_items(self):
+        """
+        Create the canvas items of the cells once. ``draw`` only updates the
+        cells that changed since the last frame.
+        """
+        self.draw_grid(self.cols, self.rows, self.cell_size)
+        self.cell_items = [
+            [
+                self.canvas.create_rectangle(
+                    i * self.cell_size,
+                    j * self.cell_size,
+                    (i + 1) * self.cell_size,
+                    (j + 1) * self.cell_size,
+                    fill="",
+                    outline="",
+                )
+                for i in range(self.cols)
+            ]
+            for j in range(self.rows)
+        ]
+        self.drawn_cells = np.zeros((self.rows, self.cols), dtype=np.bool_)
+
     def step(self, _=None):
-        next_state = [0] * self.cols
-        for i in range(0, self.cols):
-            neighbours = self.get_neighbours(i)
-            next_state[i] = self.ruleset[7 - int("".join(map(str, neighbours)), 2)]
-        self.history.append(next_state)
-        self.state = next_state
-        if len(self.history) > self.rows:
-            self.history.pop(0)
-
-    def get_neighbours(self, x):
-        return [self.state[(x + i + self.cols) % self.cols] for i in [-1, 0, 1]]
-    
+        with self.profiler.phase("step"):
+            self.advance()
+
+    def advance(self):
+        old = self.bits
+        self.bits = step_row(self.bits, self.cols, self.rule)
+        self.history.append(self.bits)
+        if self.history_file is not None:
+            self.history_file.append(self.bits)
+
+        if self.zobrist is not None:
+            changed = bit_array(old ^ self.bits, self.cols)
+            positions = np.flatnonzero(changed)
+            new = bit_array(self.bits, self.cols)[positions]
+            self.zobrist.update(positions, ~new, new)
+            self.last_change = float(positions.size > 0)
+
+    def state_hash(self):
+        """
+        The Zobrist hash of the current row (see ``cycles.ZobristHash``),
+        updated by every step for the cells that changed once requested.
+        """
+        if self.zobrist is None:
+            self.zobrist = ZobristHash(self.cols)
+        if self.zobrist.value is None:
+            self.zobrist.reset(bit_array(self.bits, self.cols))
+        return self.zobrist.value
+
+    def render_frame(self):
+        colors = np.full((self.cols, self.rows, 3), to_rgb("white"), dtype=np.uint8)
+        colors[:, :len(self.history)][self.history.cells().T] = to_rgb("black")
+        return render_grid(colors, self.cell_size, line_color="light gray")
+
+    @property
+    def state(self):
+        return unpack_row(self.bits, self.cols)
+
+    def set_bits(self, bits):
+        """Replace the current row, e.g. after an edit, and restart the history from it."""
+        self.bits = bits
+        self.history.reset(bits)
+        if self.history_file is not None:
+            self.history_file.append(bits)
+        if self.zobrist is not None:
+            self.zobrist.invalidate()
+
+    def snapshot(self):
+        return self.state
+
+    def frame_state(self):
+        return self.history.cells()
+
+    def shutdown(self):
+        if self.history_file is not None:
+            self.history_file.close()
+
     def on_click(self, event):
         x = event.x // self.cell_size
         x = min(max(x, 0), self.cols - 1)
 
-        self.state[x] = 1 - self.state[x]
-        self.history = [self.state]
+        self.set_bits(self.bits ^ 1 << x)
 
     def clear(self, _):
-        self.state = [0] * self.cols
-        self.history = [self.state]
+        self.set_bits(0)
 
     def pause(self, _):
         self.running = not self.running
 
 
-ElementaryCellularAutomaton(gif_path="sim/elementary_rule22.gif", gif_length=150)
+if __name__ == "__main__":
+    ElementaryCellularAutomaton(gif_path="sim/elementary_rule22.gif", gif_length=150)
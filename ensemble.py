@@ -0,0 +1,220 @@
+import argparse
+import time
+
+import numpy as np
+
+from conway import ConwayCell
+from cycles import CycleDetector, ZobristHash
+from floating_conway import FloatingConwayCell
+from grid import Neighbourhood, NeighbourhoodType
+
+
+class Ensemble:
+    """
+    Many boards of a grid automaton stacked along a batch axis and stepped
+    together by the ``step_states`` kernel of the cell type.
+
+    Every board keeps an incremental Zobrist hash (see
+    ``cycles.ZobristHash``) and a ``CycleDetector``, so boards that die,
+    become periodic or, with a ``tolerance``, converge are terminated
+    early. Finished boards are dropped from the batch once they make up
+    more than ``compact_fraction`` of it, so they stop costing time.
+
+    Parameters
+    ----------
+    cell_type : GridCell
+        The cell type, which must implement ``step_states``.
+    states : np.ndarray
+        The initial states of the boards, of shape (boards, cols, rows).
+    neighbourhood : Neighbourhood, optional
+        The neighbourhood. Default is a Moore neighbourhood.
+    history : int, optional
+        The longest period to detect. Default is 100.
+    tolerance : float, optional
+        Terminate a board once no cell changed by more than ``tolerance``
+        in a step, e.g. for ``FloatingConwayCell``. Default is None.
+
+    Example
+    -------
+    >>> ensemble = Ensemble.random(ConwayCell, boards=1000, cols=64, rows=64)
+    >>> for stats in ensemble.run(1000):
+    >>>     print(stats["generation"], stats["running"], stats["mean_population"])
+    """
+    compact_fraction = 0.1
+
+    def __init__(self, cell_type, states, neighbourhood=None, history=100, tolerance=None):
+        self.cell_type = cell_type
+        self.neighbourhood = neighbourhood or Neighbourhood(NeighbourhoodType.MOORE)
+        self.tolerance = tolerance
+        self.history = history
+
+        self.states = np.ascontiguousarray(states, dtype=cell_type.dtype)
+        self.back = np.empty_like(self.states)
+        boards = len(self.states)
+        self.generation = 0
+        self.board_generations = 0
+
+        # The boards in the batch and whether they have finished
+        self.index = np.arange(boards)
+        self.finished = np.zeros(boards, dtype=np.bool_)
+
+        self.zobrist = ZobristHash(self.states[0].size)
+        flat = self.states.reshape(boards, -1)
+        self.hashes = np.bitwise_xor.reduce(self.zobrist.contributions(np.arange(flat.shape[1]), flat), axis=1)
+        self.detectors = [CycleDetector(history) for _ in range(boards)]
+        for detector, value in zip(self.detectors, self.hashes.tolist()):
+            detector.observe(0, value)
+
+        self.outcomes = [None] * boards
+        self.end = np.full(boards, -1)
+        self.periods = np.zeros(boards, dtype=np.int64)
+        self.final_states = np.zeros_like(self.states)
+
+    @classmethod
+    def random(cls, cell_type, boards, cols, rows, density=0.3, seed=0, **kwargs):
+        """
+        An ensemble of random boards, where every cell is activated
+        (``cell_type().activate()``) with probability ``density``.
+        """
+        rng = np.random.default_rng(seed)
+        empty, active = cell_type().to_state(), cell_type().activate().to_state()
+        states = np.where(rng.random((boards, cols, rows)) < density, active, empty)
+        return cls(cell_type, states.astype(cell_type.dtype), **kwargs)
+
+    @property
+    def running(self):
+        """The number of boards that have not finished."""
+        return int(np.count_nonzero(~self.finished))
+
+    def population(self):
+        """The population (sum of the states) of every board in the batch."""
+        return self.states.sum(axis=(-2, -1), dtype=np.float64)
+
+    def step(self):
+        """Advance all boards by one generation."""
+        old, new = self.states, self.back
+        self.cell_type.step_states(old, self.neighbourhood, out=new)
+        self.states, self.back = new, old
+        self.generation += 1
+        self.board_generations += self.running
+
+        boards = len(new)
+        flat_old, flat_new = old.reshape(boards, -1), new.reshape(boards, -1)
+        changed = flat_old != flat_new
+        counts = np.count_nonzero(changed, axis=1)
+        rows, cells = np.divmod(np.flatnonzero(changed), flat_new.shape[1])
+        if rows.size:
+            old_values, new_values = flat_old[rows, cells], flat_new[rows, cells]
+            changes = self.zobrist.contributions(cells, old_values) ^ self.zobrist.contributions(cells, new_values)
+            offsets = np.cumsum(counts) - counts
+            self.hashes[counts > 0] ^= np.bitwise_xor.reduceat(changes, offsets[counts > 0])
+
+        if self.tolerance is not None and np.issubdtype(new.dtype, np.floating):
+            difference = np.zeros(boards)
+            if rows.size:
+                np.maximum.at(difference, rows, np.abs(new_values - old_values))
+            converged = difference <= self.tolerance
+        else:
+            converged = np.zeros(boards, dtype=np.bool_)
+
+        dead = ~flat_new.any(axis=1)
+        for row in np.flatnonzero(~self.finished).tolist():
+            board = self.index[row]
+            if dead[row]:
+                self.finish(row, "died", 0)
+            elif self.detectors[board].observe(self.generation, int(self.hashes[row])) is not None:
+                self.finish(row, "periodic", self.detectors[board].period)
+            elif converged[row]:
+                self.finish(row, "converged", 1)
+
+        if self.finished.sum() > self.compact_fraction * len(self.finished):
+            self.compact()
+
+    def finish(self, row, outcome, period):
+        board = self.index[row]
+        self.finished[row] = True
+        self.outcomes[board] = outcome
+        self.end[board] = self.generation
+        self.periods[board] = period
+        self.final_states[board] = self.states[row]
+
+    def compact(self):
+        """Drop the finished boards from the batch."""
+        keep = ~self.finished
+        self.states = np.ascontiguousarray(self.states[keep])
+        self.back = np.empty_like(self.states)
+        self.hashes = self.hashes[keep]
+        self.index = self.index[keep]
+        self.finished = self.finished[keep]
+        # The scratch buffers are per batch shape, drop the ones of the old shape
+        self.neighbourhood.buffers.clear()
+
+    def statistics(self):
+        """Aggregated statistics of the current generation."""
+        population = self.population()[~self.finished]
+        outcomes = [outcome for outcome in self.outcomes if outcome is not None]
+        return {
+            "generation": self.generation,
+            "running": len(population),
+            "died": outcomes.count("died"),
+            "periodic": outcomes.count("periodic"),
+            "converged": outcomes.count("converged"),
+            "mean_population": float(population.mean()) if len(population) else 0.0,
+            "std_population": float(population.std()) if len(population) else 0.0,
+            "min_population": float(population.min()) if len(population) else 0.0,
+            "max_population": float(population.max()) if len(population) else 0.0,
+        }
+
+    def run(self, generations, every=1):
+        """
+        Advance the boards until all of them finished or ``generations`` is
+        reached, yielding the ``statistics`` of every ``every``-th
+        generation.
+        """
+        while self.generation < generations and self.running:
+            self.step()
+            if self.generation % every == 0 or not self.running:
+                yield self.statistics()
+
+    def results(self):
+        """
+        The outcome of every board: "died", "periodic", "converged" or None
+        if it is still running, with the generation it ended at and its
+        period.
+        """
+        return [
+            {"board": board, "outcome": outcome, "generation": int(end) if outcome else None,
+             "period": int(period) if outcome else None}
+            for board, (outcome, end, period) in enumerate(zip(self.outcomes, self.end, self.periods))
+        ]
+
+
+cell_types = {
+    "conway": ConwayCell,
+    "floating": FloatingConwayCell,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an ensemble of random boards.")
+    parser.add_argument("automaton", choices=cell_types)
+    parser.add_argument("--boards", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=64)
+    parser.add_argument("--cols", type=int, default=64)
+    parser.add_argument("--density", type=float, default=0.3)
+    parser.add_argument("--generations", type=int, default=1000)
+    parser.add_argument("--every", type=int, default=100, help="report every n-th generation")
+    parser.add_argument("--history", type=int, default=100, help="longest period to detect")
+    parser.add_argument("--tolerance", type=float, help="terminate boards whose cells change by at most this")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ensemble = Ensemble.random(cell_types[args.automaton], args.boards, args.cols, args.rows,
+                               args.density, args.seed, history=args.history, tolerance=args.tolerance)
+    start = time.perf_counter()
+    for stats in ensemble.run(args.generations, args.every):
+        elapsed = time.perf_counter() - start
+        print(f"generation {stats['generation']}: {stats['running']} running, {stats['died']} died, "
+              f"{stats['periodic']} periodic, {stats['converged']} converged, "
+              f"population {stats['mean_population']:.1f} +/- {stats['std_population']:.1f}, "
+              f"{ensemble.board_generations / elapsed:.0f} board-generations/s")
@@ -1,36 +1,139 @@
 import colorsys
+from functools import lru_cache
+
+import numpy as np
+
+from drawing import to_rgb
 from grid import GridCell, GridAutomaton, NeighbourhoodType, Neighbourhood
 
+
+def float_to_color(state, start_hue=230, end_hue=320):
+    state = max(0, min(1, state))
+
+    hue = start_hue + (end_hue - start_hue) * state
+    saturation = 1.0
+    value = 0.8
+
+    r, g, b = colorsys.hsv_to_rgb(hue / 360, saturation, value)
+    return f'#{int(r * 255):02x}{int(g * 255):02x}{int(b * 255):02x}'
+
+
+@lru_cache(maxsize=None)
+def color_table(levels=256, start_hue=230, end_hue=320):
+    """
+    The colours of ``levels`` evenly spaced activations from 0 to 1, as a
+    list of Tk colours and an array of RGB colours of shape (levels, 3).
+    """
+    colors = [float_to_color(level / (levels - 1), start_hue, end_hue) for level in range(levels)]
+    return colors, np.array([to_rgb(color) for color in colors], dtype=np.uint8)
+
+
 class FloatingConwayCell(GridCell):
+    """
+    A cell of the Floating Game of Life.
+
+    The thresholds of the rules and the type of the activations are class
+    attributes, see ``configure``. Colours are looked up in a table of
+    ``color_levels`` quantized activations (see ``color_table``).
+    """
+    __slots__ = ("activation",)
+    dtype = np.float64
+    underpopulation = 2.0
+    overpopulation = 3.0
+    birth = 3.0
+    birth_tolerance = 0.15
+    decay = 0.85
+    color_levels = 256
     
     def __init__(self, activation=0):
         self.activation = activation
 
+    @classmethod
+    def configure(cls, dtype=None, **thresholds):
+        """
+        A cell type with other thresholds (``underpopulation``,
+        ``overpopulation``, ``birth``, ``birth_tolerance`` and ``decay``)
+        or another type of the activations, e.g. ``np.float32``.
+
+        With ``np.float32``, the activations take half the memory, while the
+        neighbourhood sums are still accumulated in ``np.float64``. Results
+        match the reference rules to within about 1e-7, but where a sum lies
+        within rounding distance of a threshold, the two types can decide
+        differently, after which the runs diverge.
+        """
+        unknown = set(thresholds) - {"underpopulation", "overpopulation", "birth", "birth_tolerance", "decay"}
+        if unknown:
+            raise TypeError(f"Unknown thresholds: {', '.join(sorted(unknown))}")
+        if dtype is None and not thresholds:
+            return cls
+        return type(cls.__name__, (cls,), {"__slots__": (), "dtype": dtype or cls.dtype, **thresholds})
+
+    @classmethod
+    def rule_parameters(cls):
+        return {
+            "underpopulation": cls.underpopulation,
+            "overpopulation": cls.overpopulation,
+            "birth": cls.birth,
+            "birth_tolerance": cls.birth_tolerance,
+            "decay": cls.decay,
+            "dtype": np.dtype(cls.dtype).name,
+        }
+
+    @classmethod
+    def from_rule_parameters(cls, parameters):
+        parameters = dict(parameters)
+        return cls.configure(np.dtype(parameters.pop("dtype")).type, **parameters)
+
     def update(self, neighbours):
         total_activation = sum(n.activation for n in neighbours)
-        if (total_activation < 2 or total_activation > 3):
-            return FloatingConwayCell(self.activation * 0.85)
-        elif abs(total_activation - 3) < 0.15:
-            return FloatingConwayCell(1)
+        if (total_activation < self.underpopulation or total_activation > self.overpopulation):
+            return type(self)(self.activation * self.decay)
+        elif abs(total_activation - self.birth) < self.birth_tolerance:
+            return type(self)(1)
         else:
-            return FloatingConwayCell(self.activation)
+            return type(self)(self.activation)
 
     def activate(self):
-        return FloatingConwayCell(1)
+        return type(self)(1)
+
+    def to_state(self):
+        return self.activation
+
+    @classmethod
+    def step_states(cls, activation, neighbourhood, out=None):
+        if out is None:
+            out = np.empty_like(activation)
+        total = neighbourhood.sum(activation, out=neighbourhood.buffer("total", activation.shape, np.float64))
+        decay = neighbourhood.buffer("decay", activation.shape, np.bool_)
+        full = neighbourhood.buffer("full", activation.shape, np.bool_)
+
+        np.less(total, cls.underpopulation, out=decay)
+        np.greater(total, cls.overpopulation, out=full)
+        np.logical_or(decay, full, out=decay)
+        total -= cls.birth
+        np.abs(total, out=total)
+        np.less(total, cls.birth_tolerance, out=full)
+
+        out[...] = activation
+        np.copyto(out, 1.0, where=full)
+        np.multiply(activation, cls.decay, out=out, where=decay)
+        return out
+
+    @classmethod
+    def color_level(cls, activation):
+        """The index of an activation in the ``color_table``."""
+        return np.rint(np.clip(activation, 0, 1) * (cls.color_levels - 1)).astype(np.intp)
 
     @property
     def color(self):
-        return self.float_to_color(self.activation)
-
-    def float_to_color(self, state, start_hue=230, end_hue=320):
-        state = max(0, min(1, state))
+        return color_table(self.color_levels)[0][self.color_level(self.activation)]
 
-        hue = start_hue + (end_hue - start_hue) * state
-        saturation = 1.0
-        value = 0.8
+    @classmethod
+    def state_colors(cls, states):
+        return color_table(cls.color_levels)[1][cls.color_level(states)]
 
-        r, g, b = colorsys.hsv_to_rgb(hue / 360, saturation, value)
-        return f'#{int(r * 255):02x}{int(g * 255):02x}{int(b * 255):02x}'
+    def float_to_color(self, state, start_hue=230, end_hue=320):
+        return float_to_color(state, start_hue, end_hue)
     
 
 class FloatingConway(GridAutomaton):
@@ -54,10 +157,15 @@ class FloatingConway(GridAutomaton):
       set its activation to 1. (Compare to reproduction in the original Game
       of Life)
     - All other cells will remain at their current activation.
+
+    The thresholds 2, 3, 3 +/- 0.15 and the decay of 15% can be changed
+    by passing ``thresholds`` as a dict of keyword arguments of
+    ``FloatingConwayCell.configure``, and the type of the activations of
+    the array-backed grid with ``dtype``.
     """
-    def __init__(self, pattern, **kwargs):
+    def __init__(self, pattern, dtype=None, thresholds=None, **kwargs):
         self.pattern = pattern
-        super().__init__(FloatingConwayCell, **kwargs)
+        super().__init__(FloatingConwayCell.configure(dtype, **(thresholds or {})), **kwargs)
 
     def setup(self):
         super().setup()
@@ -68,7 +176,7 @@ class FloatingConway(GridAutomaton):
         offset_y = center_y - len(self.pattern) // 2
         for y, row in enumerate(self.pattern):
             for x, cell in enumerate(row):
-                self.grid[offset_x + x][offset_y + y] = FloatingConwayCell(cell)
+                self.grid[offset_x + x][offset_y + y] = self.cell_type(cell)
 
     pattern1 = [
             [0, 0, 1, 1, 1, 1, 0, 0],
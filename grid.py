@@ -1,12 +1,26 @@
 from __future__ import annotations
 from enum import Enum
 
-from drawing import Container
+import numpy as np
+from PIL import ImageDraw, ImageFont
+
+from cycles import ZobristHash
+from drawing import Container, render_grid, to_rgb
+from parallel import TiledStepper
+from tabulation import tabulate
 
 class GridCell:
     """
     A cell in a grid-based automaton.
+
+    Subclasses that set ``dtype`` and implement ``to_state`` and
+    ``step_states`` can additionally be run on an array-backed grid, where a
+    whole generation is computed with NumPy operations instead of one
+    ``update`` call per cell.
     """
+    __slots__ = ()
+    dtype = None
+
     def update(self, neighbours) -> GridCell:
         raise NotImplementedError
 
@@ -20,6 +34,66 @@ class GridCell:
     @property
     def text(self):
         return None
+
+    def to_state(self):
+        """The value stored for this cell in an array-backed grid."""
+        raise NotImplementedError
+
+    @classmethod
+    def from_state(cls, state) -> GridCell:
+        """Create a cell from a value stored in an array-backed grid."""
+        return cls(state)
+
+    @classmethod
+    def rule_parameters(cls):
+        """
+        Override this method to return the parameters of the rules of a
+        configurable cell type as a JSON-compatible value, e.g. to tell
+        checkpoints of different rules apart. Default is None.
+        """
+        return None
+
+    @classmethod
+    def from_rule_parameters(cls, parameters):
+        """
+        Override this method together with ``rule_parameters`` to return the
+        cell type with the given parameters, e.g. to recreate a configured
+        cell type in another process. Default is the cell type itself.
+        """
+        return cls
+
+    @classmethod
+    def state_colors(cls, states):
+        """
+        The RGB colour of every cell of a grid of states, as an array with
+        an additional trailing axis of length 3.
+        """
+        values, inverse = np.unique(states, return_inverse=True)
+        palette = np.array([to_rgb(cls.from_state(value.item()).color) for value in values], dtype=np.uint8)
+        return palette[inverse.reshape(states.shape)]
+
+    @staticmethod
+    def step_states(states, neighbourhood, out=None):
+        """
+        Compute the next generation of a whole grid of states.
+
+        Parameters
+        ----------
+        states : np.ndarray
+            The cell states, indexed like the grid (``states[i, j]``).
+        neighbourhood : Neighbourhood
+            The neighbourhood of the automaton.
+        out : np.ndarray, optional
+            An array to write the next generation to. Together with the
+            scratch buffers of the neighbourhood (``Neighbourhood.buffer``)
+            this lets a step run without allocating memory.
+
+        Returns
+        -------
+        np.ndarray
+            The states of the next generation.
+        """
+        raise NotImplementedError
     
 
 class NeighbourhoodType(Enum):
@@ -30,76 +104,327 @@ class NeighbourhoodType(Enum):
     VON_NEUMANN = 2
 
 
+def _wrap_slices(n, s):
+    """
+    Pairs of (destination, source) slices that read the element ``s``
+    positions ahead on a ring of length ``n``.
+    """
+    s %= n
+    if s == 0:
+        return [(slice(None), slice(None))]
+    return [(slice(0, n - s), slice(s, n)), (slice(n - s, n), slice(0, s))]
+
+
 class Neighbourhood:
     """
     A neighbourhood for grid-based automata.
     """
+    box_sum_radius = 3
+
     def __init__(self, type: NeighbourhoodType, radius: int = 1, positional: bool = False):
         self.type = type
         self.radius = radius
         self.positional = positional
+        self.buffers = {}
+        self._offsets = tuple(
+            (x, y)
+            for x in range(-radius, radius + 1)
+            for y in range(-radius, radius + 1)
+            if (x or y) and (type == NeighbourhoodType.MOORE or abs(x) + abs(y) <= radius)
+        )
+
+    def offsets(self):
+        """
+        The relative (x, y) positions of the neighbours of a cell, in the
+        same order as returned by ``get_neighbours``. These also serve as the
+        labels of positional neighbourhoods.
+        """
+        return self._offsets
+
+    def neighbour_positions(self, i, j, cols, rows):
+        """
+        The (col, row) positions of the neighbours of cell (i, j) of a
+        toroidal ``cols x rows`` grid. As the neighbourhood is symmetric,
+        these are also the cells whose neighbourhood contains cell (i, j).
+        """
+        return [((i + x) % cols, (j + y) % rows) for x, y in self.offsets()]
+
+    def shift(self, states, offset):
+        """
+        The state of the neighbour at ``offset`` for every cell of a toroidal
+        grid of states. The grid is given by the last two axes of ``states``.
+        """
+        x, y = offset
+        return np.roll(states, (-x, -y), axis=(-2, -1))
+
+    def add_shifted(self, total, states, offset):
+        """
+        Add the state of the neighbour at ``offset`` to ``total`` in place,
+        without the temporary array created by ``shift``.
+        """
+        x, y = offset
+        for dst_x, src_x in _wrap_slices(states.shape[-2], x):
+            for dst_y, src_y in _wrap_slices(states.shape[-1], y):
+                total[..., dst_x, dst_y] += states[..., src_x, src_y]
+
+    def sum_dtype(self, dtype):
+        """The type of the neighbourhood sum of states of type ``dtype``."""
+        if np.issubdtype(dtype, np.floating):
+            return dtype
+        if dtype == np.bool_ and len(self.offsets()) < 256:
+            return np.uint8
+        return np.int32
+
+    def sum(self, states, out=None, centre=0):
+        """
+        The sum over the neighbourhood for every cell of a toroidal grid of
+        states. The grid is given by the last two axes of ``states``. With
+        a ``centre`` weight, the state of the cell itself is added
+        ``centre`` times, e.g. to index a table by state and sum at once.
+
+        Integer sums over Moore neighbourhoods of at least
+        ``box_sum_radius`` are computed from a summed-area table, so their
+        cost does not grow with the radius.
+        """
+        if out is None:
+            out = np.empty(states.shape, dtype=self.sum_dtype(states.dtype))
+        if (self.type == NeighbourhoodType.MOORE and self.radius >= self.box_sum_radius
+                and not np.issubdtype(states.dtype, np.floating)):
+            return self.box_sum(states, out, centre)
+        if centre:
+            np.multiply(states, out.dtype.type(centre), out=out, casting="unsafe")
+        else:
+            out[...] = 0
+        for offset in self.offsets():
+            self.add_shifted(out, states, offset)
+        return out
+
+    def box_sum(self, states, out, centre=0):
+        """
+        The Moore neighbourhood sum computed from a summed-area table. The
+        table and the sums are kept in scratch buffers (see ``buffer``), so
+        no memory the size of the grid is allocated.
+        """
+        r = self.radius
+        batch, (cols, rows) = states.shape[:-2], states.shape[-2:]
+
+        table = self.buffer("box_table", batch + (cols + 2 * r + 1, rows + 2 * r + 1), np.int64)
+        table[..., 0, :] = 0
+        table[..., :, 0] = 0
+
+        # The grid with a margin of r cells wrapped around from the other
+        # side, summed up in place
+        padded = table[..., 1:, 1:]
+        padded[..., r:r + cols, r:r + rows] = states
+        for k in range(r):
+            padded[..., k, r:r + rows] = padded[..., r + (k - r) % cols, r:r + rows]
+            padded[..., r + cols + k, r:r + rows] = padded[..., r + k % cols, r:r + rows]
+        for k in range(r):
+            padded[..., k] = padded[..., r + (k - r) % rows]
+            padded[..., r + rows + k] = padded[..., r + k % rows]
+        np.cumsum(padded, axis=-2, out=padded)
+        np.cumsum(padded, axis=-1, out=padded)
+
+        box = self.buffer("box_sum", states.shape, np.int64)
+        np.subtract(table[..., 2 * r + 1:, 2 * r + 1:], table[..., :cols, 2 * r + 1:], out=box)
+        box -= table[..., 2 * r + 1:, :rows]
+        box += table[..., :cols, :rows]
+        # The box includes the cell itself once
+        if centre == 0:
+            box -= states
+        elif centre != 1:
+            weighted = self.buffer("box_centre", states.shape, np.int64)
+            np.multiply(states, np.int64(centre - 1), out=weighted)
+            box += weighted
+        np.copyto(out, box, casting="unsafe")
+        return out
+
+    def buffer(self, name, shape, dtype):
+        """
+        A scratch array for the stepping kernels, allocated once per name,
+        shape and type and reused in every step.
+        """
+        key = (name, shape, np.dtype(dtype))
+        if key not in self.buffers:
+            self.buffers[key] = np.empty(shape, dtype=dtype)
+        return self.buffers[key]
 
     def get_neighbours(self, grid, i, j):
-        if self.type == NeighbourhoodType.MOORE:
-            return self.__get_moore_neighbours(grid, i, j)
-        elif self.type == NeighbourhoodType.VON_NEUMANN:
-            return self.__get_von_neumann_neighbours(grid, i, j)
-
-    def __get_moore_neighbours(self, grid, i, j):
-        neighbours = []
-        for x in range(-self.radius, self.radius + 1):
-            for y in range(-self.radius, self.radius + 1):
-                if x == 0 and y == 0:
-                    continue
-                col = (i + x + len(grid)) % len(grid)
-                row = (j + y + len(grid[0])) % len(grid[0])
-                if self.positional:
-                    neighbours.append((grid[col][row], (x, y)))
-                else:
-                    neighbours.append(grid[col][row])
-        return neighbours
-
-    def __get_von_neumann_neighbours(self, grid, i, j):
-        neighbours = []
-        for x in range(-self.radius, self.radius + 1):
-            for y in range(-self.radius, self.radius + 1):
-                if abs(x) + abs(y) > self.radius:
-                    continue
-                if x == 0 and y == 0:
-                    continue
-                col = (i + x + len(grid)) % len(grid)
-                row = (j + y + len(grid[0])) % len(grid[0])
-                if self.positional:
-                    neighbours.append((grid[col][row], (x, y)))
-                else:
-                    neighbours.append(grid[col][row])
-        return neighbours
+        cols, rows = len(grid), len(grid[0])
+        if self.positional:
+            return [(grid[(i + x) % cols][(j + y) % rows], (x, y)) for x, y in self.offsets()]
+        return [grid[(i + x) % cols][(j + y) % rows] for x, y in self.offsets()]
+
+
+def compile_rotation_table(rules, states=8):
+    """
+    Compile a rotation symmetric rule dictionary into a dense lookup table.
+
+    The rules map strings of the current state followed by the states of the
+    up, right, down and left neighbours (e.g. ``"01232"``) to a new state.
+    The table is indexed by these five digits read as a base ``states``
+    number and contains, for every configuration, the result of the first
+    matching rotation of the neighbours, or the current state if no rule
+    matches.
+
+    Parameters
+    ----------
+    rules : dict(str, int)
+        The rules of the automaton.
+    states : int, optional
+        The number of states a cell can be in. Default is 8.
+
+    Returns
+    -------
+    np.ndarray
+        The lookup table of length ``states ** 5``.
+    """
+    table = np.empty(states ** 5, dtype=np.uint8)
+    for index in range(states ** 5):
+        digits = np.base_repr(index, states).zfill(5)
+        current, neighbours = digits[0], digits[1:]
+        rotations = [neighbours[i:] + neighbours[:i] for i in range(4)]
+        table[index] = next(
+            (rules[current + rotation] for rotation in rotations if current + rotation in rules),
+            int(current)
+        )
+    return table
+
+
+def rotation_table_index(states, neighbourhood, base=8, out=None):
+    """
+    The index into a table from ``compile_rotation_table`` for every cell of
+    a toroidal grid of states.
+    """
+    if out is None:
+        out = np.empty(states.shape, dtype=np.int32)
+    out[...] = states
+    for offset in [(0, -1), (1, 0), (0, 1), (-1, 0)]:
+        out *= base
+        neighbourhood.add_shifted(out, states, offset)
+    return out
+
+
+class ArrayGrid:
+    """
+    A grid whose cells are stored as a NumPy array of cell states.
+
+    It supports the same ``grid[i][j]`` indexing as the nested lists of the
+    object path, creating cells from the stored states only when accessed.
+    The states are double buffered: a step writes the next generation into
+    ``back`` and then swaps the buffers, so no memory is allocated.
+    """
+    def __init__(self, cell_type, cols, rows, states=None):
+        self.cell_type = cell_type
+        if states is None:
+            states = np.full((cols, rows), cell_type().to_state(), dtype=cell_type.dtype)
+        self.states = states
+        self.back = np.empty_like(states)
+
+    def swap(self):
+        """Make the back buffer the current states."""
+        self.states, self.back = self.back, self.states
+
+    @classmethod
+    def from_cells(cls, cell_type, grid):
+        """Create an array-backed grid from a nested list of cells."""
+        states = np.array([[cell.to_state() for cell in column] for column in grid], dtype=cell_type.dtype)
+        return cls(cell_type, *states.shape, states=states)
+
+    def to_cells(self):
+        """Convert the grid to a nested list of cells."""
+        return [list(column) for column in self]
+
+    def __len__(self):
+        return self.states.shape[0]
+
+    def __getitem__(self, i):
+        return _ArrayColumn(self, i)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+class _ArrayColumn:
+    __slots__ = ("grid", "i")
+
+    def __init__(self, grid, i):
+        self.grid = grid
+        self.i = i
+
+    def __len__(self):
+        return self.grid.states.shape[1]
+
+    def __getitem__(self, j):
+        return self.grid.cell_type.from_state(self.grid.states[self.i, j].item())
+
+    def __setitem__(self, j, cell):
+        self.grid.states[self.i, j] = cell.to_state()
+
+    def __iter__(self):
+        return (self[j] for j in range(len(self)))
 
 
 class GridAutomaton(Container):
     """
     A grid-based automaton.
+
+    With ``vectorized=True`` the grid is stored as an ``ArrayGrid`` and each
+    generation is computed by the ``step_states`` kernel of the cell type,
+    split across ``workers`` processes if given (see ``TiledStepper``).
+    Otherwise cells are updated through their ``update`` method. For cell
+    types with a ``to_state``, only the active cells (cells whose
+    neighbourhood changed in the last generation) are updated, unless more
+    than ``full_sweep_fraction`` of the grid is active. Code that modifies
+    ``grid`` directly after ``setup`` has to call ``mark_dirty`` for the
+    modified cells (or set ``active`` to None to update the whole grid).
+
+    With ``tabulated=True``, the rule of a cell type with a small finite set
+    of states is enumerated into a lookup table once (see
+    ``tabulation.tabulate``), and the grid is stepped vectorized with the
+    table, so cell types without a ``step_states`` kernel run about as fast
+    as those with one.
+
+    Once ``state_hash`` has been called, every step updates the hash of the
+    grid for the cells that changed and sets ``last_change``.
     """
+    full_sweep_fraction = 0.5
+    clear_canvas = False
+
     def __init__(self, 
                  cell_type: GridCell,
-                 neighbourhood: Neighbourhood = Neighbourhood(NeighbourhoodType.MOORE),
+                 neighbourhood: Neighbourhood = None,
                  rows: int = 20,
                  cols: int = 20,
                  width: int = 500,
                  height: int = 500,
                  frame_rate: int = 5,
+                 vectorized: bool = False,
+                 workers: int = None,
+                 tabulated: bool = False,
                  **kwargs):
+        # A fresh default per automaton, as neighbourhoods hold the scratch buffers of the kernels
+        neighbourhood = neighbourhood or Neighbourhood(NeighbourhoodType.MOORE)
+        if tabulated:
+            cell_type = tabulate(cell_type, neighbourhood)
         self.cell_type = cell_type
+        self.neighbourhood = neighbourhood
         self.get_neighbours = neighbourhood.get_neighbours
+        self.vectorized = vectorized or tabulated
+        self.workers = workers
+        self.stepper = None
         self.rows = rows
         self.cols = cols
         self.cell_size = int(min(height / self.rows, width / self.cols))
+        self.cell_items = None
+        self.zobrist = None
         
         self.running = True
         super().__init__(width, height, frame_rate, **kwargs)
         
     def setup(self):
         self.grid = self.empty_grid()
+        self.active = None
         
         self.bind("<space>", lambda _: setattr(self, 'running', not self.running))
         
@@ -109,50 +434,236 @@ class GridAutomaton(Container):
             i = bound(int(event.x / self.cell_size), 0, self.cols - 1)
             j = bound(int(event.y / self.cell_size), 0, self.rows - 1)
             return i, j
-        self.bind("<Button-1>", lambda event: self.left_click(*get_cell(event)))
-        self.bind("<B1-Motion>", lambda event: self.drag(*get_cell(event)))
-        self.bind("<Button-3>", lambda event: self.right_click(*get_cell(event)))
+        self.bind("<Button-1>", lambda event: self.edit(self.left_click, *get_cell(event)))
+        self.bind("<B1-Motion>", lambda event: self.edit(self.drag, *get_cell(event)))
+        self.bind("<Button-3>", lambda event: self.edit(self.right_click, *get_cell(event)))
 
     def draw(self):
-        for i in range(self.cols):
-            for j in range(self.rows):
-                c = self.grid[i][j].color
-                t = self.grid[i][j].text
+        if self.cell_items is None:
+            self.create_items()
+
+        grid = self.grid if self.worker is None else self.frame_grid()
+        if isinstance(grid, ArrayGrid) and self.drawn_states is not None:
+            changed = zip(*np.nonzero(grid.states != self.drawn_states))
+        else:
+            changed = ((i, j) for i in range(self.cols) for j in range(self.rows))
+        if isinstance(grid, ArrayGrid):
+            self.drawn_states = grid.states.copy()
+
+        for i, j in changed:
+            cell = grid[i][j]
+            c = cell.color
+            t = cell.text
+            if c != self.drawn_colors[i][j]:
+                self.canvas.itemconfig(self.cell_items[i][j], fill=c)
+                self.drawn_colors[i][j] = c
+            if t != self.drawn_texts[i][j]:
+                if (i, j) not in self.text_items:
+                    self.text_items[(i, j)] = self.canvas.create_text(
+                        i * self.cell_size + self.cell_size / 2,
+                        j * self.cell_size + self.cell_size / 2,
+                        fill="#FFFFFF",
+                        font=("Arial", int(self.cell_size / 2)),
+                    )
+                self.canvas.itemconfig(self.text_items[(i, j)], text=t or "")
+                self.drawn_texts[i][j] = t
+        
+        if self.running and self.worker is None:
+            with self.profiler.phase("step"):
+                self.update()
+
+    def frame_grid(self):
+        """The grid of the ``frame`` published by the worker of a threaded automaton."""
+        if isinstance(self.frame, np.ndarray):
+            return ArrayGrid(self.cell_type, self.cols, self.rows, states=self.frame)
+        return self.frame
+
+    def create_items(self):
+        """
+        Create the canvas items of the cells and the grid lines. They are
+        created once and updated in place by ``draw`` when a cell changes.
+        """
+        self.cell_items = [
+            [
                 self.canvas.create_rectangle(
                     i * self.cell_size,
                     j * self.cell_size,
                     (i + 1) * self.cell_size,
                     (j + 1) * self.cell_size,
-                    fill=c,
                 )
-                if t:
-                    self.canvas.create_text(
-                        i * self.cell_size + self.cell_size / 2,
-                        j * self.cell_size + self.cell_size / 2,
-                        text=t,
-                        fill="#FFFFFF",
-                        font=("Arial", int(self.cell_size / 2)),
-                    )
+                for j in range(self.rows)
+            ]
+            for i in range(self.cols)
+        ]
         self.draw_grid(self.cols, self.rows, self.cell_size, color="#2F2F2F")
-        
-        if self.running:
-            self.update()
+        self.text_items = {}
+        self.drawn_colors = [[None] * self.rows for _ in range(self.cols)]
+        self.drawn_texts = [[None] * self.rows for _ in range(self.cols)]
+        self.drawn_states = None
 
     def update(self):
-        new_grid = self.empty_grid()
-        for i in range(self.cols):
-            for j in range(self.rows):
-                new_grid[i][j] = self.grid[i][j].update(self.get_neighbours(self.grid, i, j))
-        self.grid = new_grid
+        if self.vectorized and self.workers:
+            states = self.grid.states
+            if self.stepper is None:
+                self.stepper = TiledStepper(self.cell_type, self.neighbourhood, states.shape, states.dtype, self.workers)
+            self.grid.states = self.stepper.step(states)
+            self.track_changes(states, self.grid.states)
+            return
+        if self.vectorized:
+            states = self.grid.states
+            with self.profiler.phase("rules"):
+                self.cell_type.step_states(states, self.neighbourhood, out=self.grid.back)
+            self.grid.swap()
+            self.track_changes(states, self.grid.states)
+            return
+
+        if self.cell_type.dtype is None:
+            cells = [(i, j) for i in range(self.cols) for j in range(self.rows)]
+            new_grid = self.empty_grid()
+            for (i, j), cell in zip(cells, self.update_cells(cells)):
+                new_grid[i][j] = cell
+            self.grid = new_grid
+            return
+
+        if self.active is None or len(self.active) > self.full_sweep_fraction * self.rows * self.cols:
+            cells = [(i, j) for i in range(self.cols) for j in range(self.rows)]
+        else:
+            cells = self.active
+
+        updates = self.update_cells(cells)
+        self.active = set()
+        changes = []
+        for (i, j), cell in zip(cells, updates):
+            old, new = self.grid[i][j].to_state(), cell.to_state()
+            if new != old:
+                self.activate_neighbourhood(i, j)
+                changes.append((i * self.rows + j, old, new))
+            self.grid[i][j] = cell
+
+        if self.zobrist is not None:
+            positions, old, new = zip(*changes) if changes else ((), (), ())
+            self.hash_changes(
+                np.array(positions, dtype=np.intp),
+                np.array(old, dtype=self.cell_type.dtype),
+                np.array(new, dtype=self.cell_type.dtype),
+            )
+
+    def update_cells(self, cells):
+        """
+        The next generation of the cells at the given (i, j) positions.
+        With profiling enabled, the neighbours of all cells are gathered
+        before the rules are applied, so the two phases are timed
+        separately. Otherwise every cell is updated as soon as its
+        neighbours are gathered, which keeps only one neighbour list alive.
+        """
+        grid, get_neighbours = self.grid, self.get_neighbours
+        if not self.profiler.enabled:
+            return [grid[i][j].update(get_neighbours(grid, i, j)) for i, j in cells]
+        with self.profiler.phase("neighbours"):
+            neighbours = [get_neighbours(grid, i, j) for i, j in cells]
+        with self.profiler.phase("rules"):
+            return [grid[i][j].update(cell_neighbours) for (i, j), cell_neighbours in zip(cells, neighbours)]
+
+    def mark_dirty(self, i, j):
+        """
+        Mark the cells whose neighbourhood contains cell (i, j) as active,
+        after the cell was modified outside of a step.
+        """
+        if self.zobrist is not None:
+            self.zobrist.invalidate()
+        self.activate_neighbourhood(i, j)
+
+    def activate_neighbourhood(self, i, j):
+        if self.active is None:
+            return
+        self.active.add((i, j))
+        self.active.update(self.neighbourhood.neighbour_positions(i, j, self.cols, self.rows))
+
+    def state_hash(self):
+        """
+        The Zobrist hash of the grid (see ``cycles.ZobristHash``), or None
+        for cell types without ``to_state``.
+
+        The hash is computed from scratch on the first call and after the
+        grid was edited, and from then on updated by every step for the
+        cells that changed.
+        """
+        if self.cell_type.dtype is None:
+            return None
+        if self.zobrist is None:
+            self.zobrist = ZobristHash(self.cols * self.rows)
+        if self.zobrist.value is None:
+            self.zobrist.reset(self.snapshot())
+        return self.zobrist.value
+
+    def track_changes(self, old, new):
+        """Update the hash with the changes between two arrays of states."""
+        if self.zobrist is None:
+            return
+        positions = np.flatnonzero(old != new)
+        self.hash_changes(positions, old.ravel()[positions], new.ravel()[positions])
+
+    def hash_changes(self, positions, old, new):
+        self.zobrist.update(positions, old, new)
+        if len(positions) == 0:
+            self.last_change = 0.0
+        elif np.issubdtype(self.cell_type.dtype, np.floating):
+            self.last_change = float(np.max(np.abs(new - old)))
+        else:
+            self.last_change = 1.0
+
+    def step(self, _=None):
+        with self.profiler.phase("step"):
+            self.update()
+
+    def shutdown(self):
+        if self.stepper is not None:
+            self.stepper.close()
+
+    def render_frame(self):
+        if isinstance(self.grid, ArrayGrid):
+            colors = self.cell_type.state_colors(self.grid.states)
+        else:
+            colors = [[to_rgb(cell.color) for cell in column] for column in self.grid]
+        image = render_grid(colors, self.cell_size, line_color="#2F2F2F")
+
+        if self.cell_type.text is not GridCell.text:
+            draw = ImageDraw.Draw(image)
+            font = ImageFont.load_default(size=int(self.cell_size / 2))
+            for i, column in enumerate(self.grid):
+                for j, cell in enumerate(column):
+                    if cell.text:
+                        draw.text(
+                            ((i + 0.5) * self.cell_size, (j + 0.5) * self.cell_size),
+                            cell.text,
+                            fill="#FFFFFF",
+                            font=font,
+                            anchor="mm",
+                        )
+        return image
+
+    def snapshot(self):
+        if self.vectorized:
+            return self.grid.states.copy()
+        if self.cell_type.dtype is not None:
+            return ArrayGrid.from_cells(self.cell_type, self.grid).states
+        return [column[:] for column in self.grid]
 
     def left_click(self, i, j):
         self.grid[i][j] = self.grid[i][j].activate()
+        self.mark_dirty(i, j)
 
     def drag(self, i, j):
         self.grid[i][j] = self.grid[i][j].activate()
+        self.mark_dirty(i, j)
 
     def right_click(self, i, j):
         self.grid = self.empty_grid()
+        self.active = None
+        if self.zobrist is not None:
+            self.zobrist.invalidate()
 
     def empty_grid(self):
+        if self.vectorized:
+            return ArrayGrid(self.cell_type, self.cols, self.rows)
         return [[self.cell_type()] * self.rows for _ in range(self.cols)]
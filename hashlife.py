@@ -0,0 +1,315 @@
+import sys
+
+import numpy as np
+
+
+class Node:
+    """
+    A quadtree node (macrocell) of the HashLife universe.
+
+    A node of level ``k`` covers a square of ``2^k x 2^k`` cells and is made
+    up of four nodes of level ``k - 1``. Level 0 nodes are single cells.
+    """
+    __slots__ = ("nw", "ne", "sw", "se", "level", "population")
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+off = Node(None, None, None, None, 0, 0)
+on = Node(None, None, None, None, 0, 1)
+
+
+class HashLife:
+    """
+    Conway's Game of Life on an unbounded plane using Gosper's HashLife
+    algorithm.
+
+    The universe is stored as a quadtree of canonical (hash-consed) nodes,
+    and the future of every node is memoized, so regular patterns can be
+    advanced by huge numbers of generations at once. Unlike ``GameOfLife``,
+    the universe is not a torus: patterns never wrap around.
+
+    Once the node table grows beyond ``max_nodes``, the memoized results are
+    dropped and only the nodes reachable from the current universe and from
+    the step in progress are kept. The limit is checked before every result
+    above level 2 is computed, even within a single step of ``2^j``
+    generations, so the table exceeds it by at most the few dozen nodes
+    created between two checks. If the kept nodes alone fill more than half
+    of ``max_nodes``, the limit is raised to twice their number until the
+    next collection, so that every collection frees enough room to make
+    progress; only then can the table grow beyond ``max_nodes``.
+
+    Example
+    -------
+    >>> life = HashLife.from_states(GameOfLife(headless=True).snapshot())
+    >>> life.advance(2 ** 20)
+    >>> life.population
+    """
+    def __init__(self, max_nodes=1_000_000):
+        self.max_nodes = max_nodes
+        self.node_limit = max_nodes
+        self.live = []
+        self.nodes = {}
+        self.results = {}
+        self.zeros = [off]
+        self.collections = 0
+        self.generation = 0
+        self.root = self.zero(3)
+
+    @classmethod
+    def from_states(cls, states, x0=0, y0=0, **kwargs):
+        """
+        Create a universe from a grid of states indexed like
+        ``GridAutomaton`` grids (``states[i][j]`` for column ``i`` and row
+        ``j``), e.g. ``GameOfLife.snapshot()``. The cell ``states[0][0]``
+        is placed at ``(x0, y0)``.
+        """
+        life = cls(**kwargs)
+        xs, ys = np.nonzero(np.asarray(states))
+        life.set_cells(zip((xs + x0).tolist(), (ys + y0).tolist()))
+        return life
+
+    def to_states(self, x0, y0, cols, rows):
+        """
+        Export the ``cols x rows`` window with its top left corner at
+        ``(x0, y0)`` as a boolean array indexed ``[i, j]``.
+        """
+        states = np.zeros((cols, rows), dtype=np.bool_)
+        for x, y in self.cells():
+            if x0 <= x < x0 + cols and y0 <= y < y0 + rows:
+                states[x - x0, y - y0] = True
+        return states
+
+    @property
+    def population(self):
+        return self.root.population
+
+    def join(self, nw, ne, sw, se):
+        """The canonical node made up of the given four quadrants."""
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+    def zero(self, level):
+        """The empty node of the given level."""
+        while len(self.zeros) <= level:
+            z = self.zeros[-1]
+            self.zeros.append(self.join(z, z, z, z))
+        return self.zeros[level]
+
+    def centre(self, node):
+        """A node one level larger with ``node`` at its centre."""
+        z = self.zero(node.level - 1)
+        return self.join(
+            self.join(z, z, z, node.nw),
+            self.join(z, z, node.ne, z),
+            self.join(z, node.sw, z, z),
+            self.join(node.se, z, z, z),
+        )
+
+    def set_cells(self, cells):
+        """Make the cells at the given (x, y) positions alive."""
+        cells = set(cells) | set(self.cells())
+        level = 3
+        while cells and max(max(x + 1, -x, y + 1, -y) for x, y in cells) > 2 ** (level - 1):
+            level += 1
+        self.root = self.build(cells, -2 ** (level - 1), -2 ** (level - 1), level)
+
+    def build(self, cells, x0, y0, level):
+        if not cells:
+            return self.zero(level)
+        if level == 0:
+            return on
+        half = 2 ** (level - 1)
+        quadrants = [set(), set(), set(), set()]
+        for x, y in cells:
+            quadrants[(x >= x0 + half) + 2 * (y >= y0 + half)].add((x, y))
+        return self.join(
+            self.build(quadrants[0], x0, y0, level - 1),
+            self.build(quadrants[1], x0 + half, y0, level - 1),
+            self.build(quadrants[2], x0, y0 + half, level - 1),
+            self.build(quadrants[3], x0 + half, y0 + half, level - 1),
+        )
+
+    def cells(self):
+        """The (x, y) positions of all living cells."""
+        half = 2 ** (self.root.level - 1)
+        stack = [(self.root, -half, -half)]
+        while stack:
+            node, x, y = stack.pop()
+            if node.population == 0:
+                continue
+            if node.level == 0:
+                yield x, y
+                continue
+            half = 2 ** (node.level - 1)
+            stack.append((node.nw, x, y))
+            stack.append((node.ne, x + half, y))
+            stack.append((node.sw, x, y + half))
+            stack.append((node.se, x + half, y + half))
+
+    def bounding_box(self):
+        """The bounding box (x_min, y_min, x_max, y_max) of the living cells."""
+        cells = list(self.cells())
+        if not cells:
+            return None
+        xs, ys = zip(*cells)
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def life_4x4(self, node):
+        """The centre 2x2 cells of a level 2 node after one generation."""
+        cells = [[0] * 4 for _ in range(4)]
+        for qy, row in enumerate([(node.nw, node.ne), (node.sw, node.se)]):
+            for qx, quadrant in enumerate(row):
+                cells[2 * qy][2 * qx] = quadrant.nw.population
+                cells[2 * qy][2 * qx + 1] = quadrant.ne.population
+                cells[2 * qy + 1][2 * qx] = quadrant.sw.population
+                cells[2 * qy + 1][2 * qx + 1] = quadrant.se.population
+
+        def next_state(x, y):
+            count = sum(cells[y + dy][x + dx] for dx in (-1, 0, 1) for dy in (-1, 0, 1)) - cells[y][x]
+            return on if count == 3 or (cells[y][x] and count == 2) else off
+
+        return self.join(next_state(1, 1), next_state(2, 1), next_state(1, 2), next_state(2, 2))
+
+    def successor(self, node, j):
+        """
+        The centre node of ``node`` (one level smaller) advanced by ``2^j``
+        generations, where ``j <= node.level - 2``.
+        """
+        key = (node, j)
+        result = self.results.get(key)
+        if result is not None:
+            return result
+
+        if node.population == 0:
+            result = node.nw
+        elif node.level == 2:
+            result = self.life_4x4(node)
+        else:
+            # Keep the nodes of the step in progress through a collection
+            live = self.live
+            mark = len(live)
+            live.append(node)
+            if len(self.nodes) > self.node_limit:
+                self.collect()
+
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            join, successor, push = self.join, self.successor, live.append
+            c1 = successor(join(nw.nw, nw.ne, nw.sw, nw.se), j)
+            push(c1)
+            c2 = successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            push(c2)
+            c3 = successor(join(ne.nw, ne.ne, ne.sw, ne.se), j)
+            push(c3)
+            c4 = successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            push(c4)
+            c5 = successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+            push(c5)
+            c6 = successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+            push(c6)
+            c7 = successor(join(sw.nw, sw.ne, sw.sw, sw.se), j)
+            push(c7)
+            c8 = successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+            push(c8)
+            c9 = successor(join(se.nw, se.ne, se.sw, se.se), j)
+            push(c9)
+
+            if j < node.level - 2:
+                # Only the first level advances time, the rest just recentres
+                result = join(
+                    join(c1.se, c2.sw, c4.ne, c5.nw),
+                    join(c2.se, c3.sw, c5.ne, c6.nw),
+                    join(c4.se, c5.sw, c7.ne, c8.nw),
+                    join(c5.se, c6.sw, c8.ne, c9.nw),
+                )
+            else:
+                q1 = successor(join(c1, c2, c4, c5), j)
+                push(q1)
+                q2 = successor(join(c2, c3, c5, c6), j)
+                push(q2)
+                q3 = successor(join(c4, c5, c7, c8), j)
+                push(q3)
+                q4 = successor(join(c5, c6, c8, c9), j)
+                result = join(q1, q2, q3, q4)
+            del live[mark:]
+
+        self.results[key] = result
+        return result
+
+    def is_padded(self, node):
+        """Whether all living cells of ``node`` lie within its centre half."""
+        return (node.nw.population == node.nw.se.se.population
+                and node.ne.population == node.ne.sw.sw.population
+                and node.sw.population == node.sw.ne.ne.population
+                and node.se.population == node.se.nw.nw.population)
+
+    def step(self, j):
+        """Advance the universe by ``2^j`` generations."""
+        while self.root.level < j + 2 or not self.is_padded(self.root):
+            self.root = self.centre(self.root)
+        self.root = self.successor(self.centre(self.root), j)
+        self.generation += 2 ** j
+
+        if len(self.nodes) > self.node_limit:
+            self.collect()
+
+    def advance(self, generations):
+        """Advance the universe by an arbitrary number of generations."""
+        j = 0
+        while generations:
+            if generations & 1:
+                self.step(j)
+            generations >>= 1
+            j += 1
+
+    def collect(self):
+        """
+        Drop all memoized results and all nodes that are not part of the
+        current universe or of the step in progress.
+        """
+        self.results.clear()
+        self.nodes.clear()
+        self.zeros = [off]
+        self.collections += 1
+
+        def rebuild(node):
+            if node.level == 0:
+                return node
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in self.nodes:
+                for child in key:
+                    rebuild(child)
+                self.nodes[key] = node
+            return node
+
+        rebuild(self.root)
+        for node in self.live:
+            rebuild(node)
+        self.node_limit = max(self.max_nodes, 2 * len(self.nodes))
+
+    def memory_usage(self):
+        """
+        The size of the node table and the result cache, with an estimate of
+        the memory they use in bytes.
+        """
+        node_size = sys.getsizeof(self.root) + sys.getsizeof((off, off, off, off))
+        result_size = sys.getsizeof((off, 0))
+        return {
+            "nodes": len(self.nodes),
+            "results": len(self.results),
+            "max_nodes": self.max_nodes,
+            "collections": self.collections,
+            "bytes": len(self.nodes) * node_size + len(self.results) * result_size
+                     + sys.getsizeof(self.nodes) + sys.getsizeof(self.results),
+        }
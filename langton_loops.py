@@ -1,4 +1,6 @@
-from grid import GridCell, GridAutomaton, NeighbourhoodType, Neighbourhood
+import numpy as np
+
+from grid import GridCell, GridAutomaton, NeighbourhoodType, Neighbourhood, compile_rotation_table, rotation_table_index
 
 
 class LangtonCell(GridCell):
@@ -231,6 +233,12 @@ class LangtonCell(GridCell):
         (0, 1): "down",
         (-1, 0): "left",
     }
+    pos_weight_map = {
+        "up": 8 ** 3,
+        "right": 8 ** 2,
+        "down": 8,
+        "left": 1,
+    }
     state_color_map = {
         0: "black",
         1: "blue",
@@ -242,38 +250,37 @@ class LangtonCell(GridCell):
         7: "cyan",
     }
 
+    __slots__ = ("state",)
+    dtype = np.uint8
+
     def __init__(self, state=0):
         self.state = state
 
     def update(self, neighbours):
-        pos_neighbours = {}
+        index = self.state * 8 ** 4
         for n, (x, y) in neighbours:
-            pos_neighbours[self.coord_pos_map[(x, y)]] = n.state
-
-        # Convert coordinates and states to a string representing the neighbourhood
-        neighbours_state = ''.join(
-            str(pos_neighbours[dir]) for dir in
-            ["up", "right", "down", "left"]
-        )
-
-        # Generate all rotations of the neighbourhood
-        all_rotations = [neighbours_state[i:] + neighbours_state[:i] for i in range(4)]
-
-        # Find the new state based on the rules
-        new_state = next(
-            (self.rules[f"{self.state}{rotation}"] for rotation in all_rotations if f"{self.state}{rotation}" in self.rules),
-            self.state  # Default to current state if no rule matches
-        )
-        return LangtonCell(new_state)
+            index += n.state * self.pos_weight_map[self.coord_pos_map[(x, y)]]
+        return LangtonCell(int(self.table[index]))
 
     def activate(self):
         return LangtonCell((self.state + 1) % 8)
 
+    def to_state(self):
+        return self.state
+
+    @classmethod
+    def step_states(cls, states, neighbourhood, out=None):
+        index = rotation_table_index(states, neighbourhood, out=neighbourhood.buffer("index", states.shape, np.uint16))
+        return np.take(cls.table, index, out=out)
+
     @property
     def color(self):
         return self.state_color_map[self.state]
     
 
+LangtonCell.table = compile_rotation_table(LangtonCell.rules)
+
+
 class LangtonLoops(GridAutomaton):
 
     def __init__(self, **kwargs):
@@ -0,0 +1,157 @@
+import inspect
+import os
+import sys
+import weakref
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from tabulation import tabulate
+
+
+_worker = {}
+
+
+def _importable(cls):
+    """Whether pickle can find ``cls`` by its module and name."""
+    return getattr(sys.modules.get(cls.__module__), cls.__qualname__, None) is cls
+
+
+def cell_type_spec(cell_type):
+    """
+    A picklable description of a cell type, from which ``rebuild_cell_type``
+    recreates it in another process.
+
+    Pickle stores classes by reference, so the cell types created at
+    runtime by ``configure`` methods or ``tabulation.tabulate`` cannot be
+    sent to processes started with the spawn or forkserver methods. They
+    are described instead by the closest base class that can be imported,
+    their ``rule_parameters`` and, for tabulated cell types, the states
+    passed to ``tabulate``.
+
+    Returns
+    -------
+    tuple(type, object, bool, list)
+        The base class, the rule parameters, whether the cell type is
+        tabulated and the states of the table.
+    """
+    tabulated = getattr(cell_type, "tabulated", False)
+    configured = cell_type.__mro__[1] if tabulated else cell_type
+    base = next(cls for cls in configured.__mro__ if _importable(cls))
+    for cls in configured.__mro__[:configured.__mro__.index(base)]:
+        if any(inspect.isroutine(value) or isinstance(value, (classmethod, staticmethod, property))
+               for name, value in vars(cls).items() if not name.startswith("__")):
+            raise TypeError(f"{cls.__qualname__} defines methods but cannot be imported by worker processes, "
+                            "define it at the top level of a module")
+    return base, configured.rule_parameters(), tabulated, getattr(cell_type, "tabulated_states", None)
+
+
+def rebuild_cell_type(spec, neighbourhood):
+    """The cell type described by a ``cell_type_spec``."""
+    base, parameters, tabulated, states = spec
+    cell_type = base.from_rule_parameters(parameters)
+    if tabulated:
+        cell_type = tabulate(cell_type, neighbourhood, states)
+    return cell_type
+
+
+def _init_worker(names, shape, dtype, spec, neighbourhood):
+    _worker["memory"] = [SharedMemory(name=name) for name in names]
+    _worker["buffers"] = [np.ndarray(shape, dtype=dtype, buffer=memory.buf) for memory in _worker["memory"]]
+    _worker["cell_type"] = rebuild_cell_type(spec, neighbourhood)
+    _worker["neighbourhood"] = neighbourhood
+
+
+def _step_tile(source, start, stop):
+    src = _worker["buffers"][source]
+    dst = _worker["buffers"][1 - source]
+    halo = _worker["neighbourhood"].radius
+
+    # The halo rows of the neighbouring tiles, wrapping around the torus
+    tile = np.take(src, range(start - halo, stop + halo), axis=0, mode="wrap")
+    result = _worker["cell_type"].step_states(tile, _worker["neighbourhood"])
+    dst[start:stop] = result[halo:halo + stop - start]
+
+
+def _release(pool, memory):
+    pool.terminate()
+    for block in memory:
+        block.close()
+        block.unlink()
+
+
+class TiledStepper:
+    """
+    Steps an array-backed grid in parallel on a pool of processes.
+
+    The toroidal grid is split into tiles of whole columns that are stepped
+    by the ``step_states`` kernel of the cell type in separate processes.
+    Each tile is padded with a halo of ``neighbourhood.radius`` columns
+    from its neighbours, so the result is identical to stepping the whole
+    grid at once. The grid is double buffered in shared memory, so the
+    states are never copied between processes.
+
+    Parameters
+    ----------
+    cell_type : GridCell
+        The cell type, which must implement ``step_states``. Cell types
+        created at runtime are recreated in the processes from their
+        ``cell_type_spec``.
+    neighbourhood : Neighbourhood
+        The neighbourhood of the automaton.
+    shape : tuple(int, int)
+        The shape of the grid of states.
+    dtype : np.dtype
+        The type of the states.
+    workers : int, optional
+        The number of processes. Default is the number of CPUs.
+    tiles : int, optional
+        The number of tiles. Default is the number of processes.
+    """
+    def __init__(self, cell_type, neighbourhood, shape, dtype, workers=None, tiles=None):
+        workers = workers or os.cpu_count()
+        tiles = min(tiles or workers, shape[0])
+        spec = cell_type_spec(cell_type)
+        if rebuild_cell_type(spec, neighbourhood).rule_parameters() != cell_type.rule_parameters():
+            raise TypeError(f"{cell_type.__qualname__} cannot be recreated from its rule parameters")
+
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.memory = [SharedMemory(create=True, size=max(size, 1)) for _ in range(2)]
+        self.buffers = [np.ndarray(shape, dtype=dtype, buffer=memory.buf) for memory in self.memory]
+        self.source = 0
+
+        bounds = np.linspace(0, shape[0], tiles + 1).astype(int)
+        self.tiles = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        try:
+            self.pool = Pool(
+                workers,
+                initializer=_init_worker,
+                initargs=([memory.name for memory in self.memory], shape, dtype, spec, neighbourhood),
+            )
+        except BaseException:
+            for memory in self.memory:
+                memory.close()
+                memory.unlink()
+            raise
+        self.finalizer = weakref.finalize(self, _release, self.pool, self.memory)
+
+    def step(self, states):
+        """
+        Compute the next generation of ``states``.
+
+        Returns a view of a shared buffer. It stays valid until the step
+        after next, so it can be passed back in as ``states``.
+        """
+        if states is self.buffers[1 - self.source]:
+            self.source = 1 - self.source
+        elif states is not self.buffers[self.source]:
+            self.buffers[self.source][...] = states
+
+        self.pool.starmap(_step_tile, [(self.source, start, stop) for start, stop in self.tiles])
+        return self.buffers[1 - self.source]
+
+    def close(self):
+        """Stop the processes and free the shared memory."""
+        self.finalizer()
@@ -0,0 +1,204 @@
+import re
+
+import numpy as np
+
+from grid import ArrayGrid
+from sparse_life import SparseGameOfLife
+
+
+def state_symbol(state, multistate):
+    """
+    The RLE symbol of a state: ``b`` and ``o`` for two-state patterns, or
+    ``.``, ``A`` to ``X`` and ``pA`` to ``yO`` in Golly's multi-state RLE.
+    """
+    if not multistate:
+        return "o" if state else "b"
+    if state == 0:
+        return "."
+    if state <= 24:
+        return chr(ord("A") + state - 1)
+    prefix, state = divmod(state - 25, 24)
+    return chr(ord("p") + prefix) + chr(ord("A") + state)
+
+
+def symbol_state(symbol):
+    if symbol in "b.":
+        return 0
+    if symbol == "o":
+        return 1
+    if len(symbol) == 1:
+        return ord(symbol) - ord("A") + 1
+    return 25 + (ord(symbol[0]) - ord("p")) * 24 + ord(symbol[1]) - ord("A")
+
+
+token = re.compile(r"(\d*)([bo.A-X$!]|[p-y][A-X])")
+
+# The rule takes the rest of the line, as it may contain commas itself
+header_line = re.compile(r"x\s*=\s*(?P<x>\d+)\s*,\s*y\s*=\s*(?P<y>\d+)(?:\s*,\s*rule\s*=(?P<rule>.*))?")
+
+
+def parse_rle(text):
+    """
+    Parse a pattern in run length encoding, as used by Golly and most Life
+    pattern collections. Both two-state (``b``/``o``) and Golly's multi-state
+    (``.``/``A``/``B``/...) patterns are supported.
+
+    The pattern is decoded run by run straight into an array, without
+    creating a cell object per cell.
+
+    Parameters
+    ----------
+    text : str
+        The contents of the RLE file.
+
+    Returns
+    -------
+    tuple(np.ndarray, str)
+        The states as a ``uint8`` array indexed ``[i, j]`` like the grids,
+        and the rule given in the header (or None).
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    lines = [line for line in lines if line and not line.startswith("#")]
+    header = header_line.fullmatch(lines[0])
+    if header is None:
+        raise ValueError(f"Invalid RLE header {lines[0]!r}")
+    cols, rows, rule = int(header["x"]), int(header["y"]), header["rule"]
+    states = np.zeros((cols, rows), dtype=np.uint8)
+
+    i = j = 0
+    for count, symbol in token.findall("".join(lines[1:])):
+        count = int(count or 1)
+        if symbol == "!":
+            break
+        if symbol == "$":
+            i, j = 0, j + count
+            continue
+        state = symbol_state(symbol)
+        if state:
+            states[i:i + count, j] = state
+        i += count
+    return states, rule.strip() if rule else None
+
+
+def format_rle(states, rule=None, line_length=70):
+    """
+    Encode a grid of states in run length encoding. Grids with more than
+    two states use Golly's multi-state symbols.
+
+    Parameters
+    ----------
+    states : np.ndarray
+        The states, indexed ``[i, j]`` like the grids.
+    rule : str, optional
+        The rule to note in the header, e.g. "B3/S23". Default is None.
+    line_length : int, optional
+        The maximal length of the lines of the encoded pattern. Default is 70.
+
+    Returns
+    -------
+    str
+        The encoded pattern.
+    """
+    states = np.asarray(states).astype(np.uint8)
+    cols, rows = states.shape
+    multistate = states.max(initial=0) > 1
+
+    runs = []
+    empty_rows = 0
+    for j in range(rows):
+        row = states[:, j].astype(np.int16)
+        length = np.flatnonzero(row)[-1] + 1 if row.any() else 0
+        if not length:
+            empty_rows += 1
+            continue
+        if runs or empty_rows:
+            runs.append((empty_rows + 1 if runs else empty_rows, "$"))
+        empty_rows = 0
+
+        # Split the row into runs of equal states
+        starts = np.flatnonzero(np.diff(row[:length], prepend=-1))
+        counts = np.diff(np.append(starts, length))
+        runs.extend((count, state_symbol(int(row[start]), multistate)) for start, count in zip(starts, counts))
+    runs.append((1, "!"))
+
+    lines = [f"x = {cols}, y = {rows}" + (f", rule = {rule}" if rule else "")]
+    line = ""
+    for count, symbol in runs:
+        if not count:
+            continue
+        item = (str(count) if count > 1 else "") + symbol
+        if len(line) + len(item) > line_length:
+            lines.append(line)
+            line = ""
+        line += item
+    lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def read_rle(path):
+    """Read an RLE file, see ``parse_rle``."""
+    with open(path) as f:
+        return parse_rle(f.read())
+
+
+def write_rle(path, states, rule=None):
+    """Write a grid of states to an RLE file, see ``format_rle``."""
+    with open(path, "w") as f:
+        f.write(format_rle(states, rule))
+
+
+def place(automaton, states, i=None, j=None):
+    """
+    Place a pattern on the grid of a grid automaton, with its top left
+    corner at cell ``(i, j)``. By default, the pattern is centred.
+
+    On array-backed grids the pattern is copied into the array of states
+    directly. A ``SparseGameOfLife`` has no edges, so any pattern fits, and
+    by default it is centred on the origin.
+    """
+    if isinstance(automaton, SparseGameOfLife):
+        automaton.place(states, i, j)
+        return
+
+    cols, rows = states.shape
+    if cols > automaton.cols or rows > automaton.rows:
+        raise ValueError(f"Pattern of size {cols}x{rows} does not fit into a {automaton.cols}x{automaton.rows} grid")
+    i = (automaton.cols - cols) // 2 if i is None else i
+    j = (automaton.rows - rows) // 2 if j is None else j
+
+    if isinstance(automaton.grid, ArrayGrid):
+        automaton.grid.states[i:i + cols, j:j + rows] = states
+    else:
+        cells = ArrayGrid(automaton.cell_type, cols, rows, states=states.astype(automaton.cell_type.dtype)).to_cells()
+        for x, column in enumerate(cells):
+            automaton.grid[i + x][j:j + rows] = column
+
+    automaton.active = None
+    if automaton.zobrist is not None:
+        automaton.zobrist.invalidate()
+
+
+def load_pattern(automaton, path, i=None, j=None):
+    """Read an RLE file and ``place`` it on the grid of an automaton."""
+    states, _ = read_rle(path)
+    place(automaton, states, i, j)
+
+
+def export_pattern(automaton, path, rule=None):
+    """
+    Write the live part of the grid of an automaton (the bounding box of its
+    non-zero states) to an RLE file.
+    """
+    if isinstance(automaton, SparseGameOfLife):
+        bounds = automaton.life.bounding_box() or (0, 0, -1, -1)
+        x_min, y_min, x_max, y_max = bounds
+        write_rle(path, automaton.life.to_states(x_min, y_min, x_max - x_min + 1, y_max - y_min + 1), rule)
+        return
+
+    states = np.asarray(automaton.snapshot())
+    xs, ys = np.nonzero(states)
+    if xs.size:
+        states = states[xs.min():xs.max() + 1, ys.min():ys.max() + 1]
+    else:
+        states = states[:0, :0]
+    write_rle(path, states, rule)
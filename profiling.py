@@ -0,0 +1,161 @@
+import csv
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+
+_disabled = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start", "children")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.children = 0.0
+        self.profiler.stack.append(self)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *_):
+        duration = time.perf_counter() - self.start
+        stack = self.profiler.stack
+        stack.pop()
+        if stack:
+            stack[-1].children += duration
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + duration - self.children
+
+
+class Profiler:
+    """
+    Records how long the phases of every frame take.
+
+    Phases are timed with ``phase``, which returns a context manager. Nested
+    phases are subtracted from the phases they are nested in, so the time of
+    each phase is exclusive and the phases of a frame add up to the frame.
+    When the profiler is disabled, ``phase`` returns a shared no-op context
+    manager, so instrumented code costs a method call per phase.
+
+    The phases used by the automata are:
+
+    - ``capture``: rendering or capturing the frame for the gif
+    - ``draw``: updating the canvas
+    - ``grid``: drawing the grid lines
+    - ``step``: computing the next generation, apart from the following
+    - ``neighbours``: gathering the neighbours of the cells (object path)
+    - ``rules``: applying the rules to the cells
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        Whether to record anything. Default is False.
+    budget : float, optional
+        The time available for a frame in seconds, e.g. ``1 / frame_rate``.
+        Frames taking longer are counted as overruns. Default is None.
+    window : int, optional
+        The number of most recent frames kept for the statistics and the
+        export. Default is 1000.
+    """
+    percentiles = (50, 90, 99)
+
+    def __init__(self, enabled=False, budget=None, window=1000):
+        self.enabled = enabled
+        self.budget = budget
+        self.frames = deque(maxlen=window)
+        self.stack = []
+        self.current = {}
+        self.frame_count = 0
+        self.overruns = 0
+        self.frame_start = None
+
+    def phase(self, name):
+        """A context manager timing the phase ``name`` of the current frame."""
+        if not self.enabled:
+            return _disabled
+        return _Phase(self, name)
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.current = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        total = time.perf_counter() - self.frame_start
+        overrun = self.budget is not None and total > self.budget
+        self.overruns += overrun
+        self.frames.append({"frame": self.frame_count, "total": total, "overrun": overrun, **self.current})
+        self.frame_count += 1
+        self.frame_start = None
+
+    def phases(self):
+        """The names of all phases recorded in the window, in order of appearance."""
+        names = {}
+        for frame in self.frames:
+            names.update(dict.fromkeys(frame))
+        return [name for name in names if name not in ("frame", "total", "overrun")]
+
+    def summary(self):
+        """
+        Statistics of the frames in the window: for the whole frame and
+        every phase the number of frames it occurred in, the mean, the
+        maximum and the ``percentiles`` of its duration in seconds, as well
+        as the number of frames that overran the budget.
+        """
+        stats = {}
+        for name in ["total"] + self.phases():
+            durations = np.array([frame[name] for frame in self.frames if name in frame])
+            if not durations.size:
+                continue
+            stats[name] = {
+                "count": int(durations.size),
+                "mean": float(durations.mean()),
+                "max": float(durations.max()),
+                **{f"p{p}": float(value) for p, value in zip(self.percentiles, np.percentile(durations, self.percentiles))},
+            }
+        return {
+            "frames": self.frame_count,
+            "budget": self.budget,
+            "overruns": self.overruns,
+            "window_overruns": sum(frame["overrun"] for frame in self.frames),
+            "phases": stats,
+        }
+
+    def to_json(self, path):
+        """Write the summary and the frames in the window to a JSON file."""
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(), "frames": list(self.frames)}, f, indent=2)
+
+    def to_csv(self, path):
+        """Write the frames in the window to a CSV file, one column per phase."""
+        columns = ["frame", "total", "overrun"] + self.phases()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, columns, restval=0.0)
+            writer.writeheader()
+            writer.writerows(self.frames)
+
+    def export(self, path):
+        """Write to a CSV file if ``path`` ends in ``.csv``, otherwise to JSON."""
+        if path.endswith(".csv"):
+            self.to_csv(path)
+        else:
+            self.to_json(path)
+
+    def overlay_text(self):
+        """A short text with the median and 90th percentile of every phase in milliseconds."""
+        summary = self.summary()
+        lines = [
+            f"{name:<10} {stats['p50'] * 1000:7.2f} {stats['p90'] * 1000:7.2f} ms"
+            for name, stats in summary["phases"].items()
+        ]
+        if self.budget is not None and self.frames:
+            lines.append(f"overruns   {summary['window_overruns'] / len(self.frames):.0%} of {self.budget * 1000:.0f} ms")
+        return "\n".join(["phase        p50     p90"] + lines)
@@ -0,0 +1,155 @@
+from math import factorial
+
+import numpy as np
+
+from table_cache import load_table
+
+
+unreachable = 255
+
+
+def rank(permutation):
+    """
+    The index of a permutation of ``0..n-1`` among all ``n!`` permutations
+    in lexicographic order (a perfect hash of the permutation).
+    """
+    n = len(permutation)
+    index = 0
+    for i, value in enumerate(permutation):
+        smaller = sum(other < value for other in permutation[i + 1:])
+        index += smaller * factorial(n - 1 - i)
+    return index
+
+
+def unrank(index, n):
+    """The permutation of ``0..n-1`` with the given ``rank``."""
+    remaining = list(range(n))
+    permutation = []
+    for i in range(n):
+        position, index = divmod(index, factorial(n - 1 - i))
+        permutation.append(remaining.pop(position))
+    return permutation
+
+
+def moves(tiles, size):
+    """
+    The boards reachable with one move, as tuples of (move, board). Moves
+    are moves of the empty cell in grid coordinates, as in
+    ``EightPuzzleSolver.apply_move``.
+    """
+    blank = tiles.index(0)
+    x, y = blank % size, blank // size
+    for move in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        new_x, new_y = x + move[0], y + move[1]
+        if 0 <= new_x < size and 0 <= new_y < size:
+            target = new_y * size + new_x
+            board = list(tiles)
+            board[blank], board[target] = board[target], 0
+            yield move, board
+
+
+def goal_tiles(size):
+    return list(range(1, size * size)) + [0]
+
+
+def build_distance_table(size=3):
+    """
+    The optimal number of moves to the goal for every board of a sliding
+    puzzle, indexed by the ``rank`` of the board in reading order.
+    Unsolvable boards are marked as ``unreachable``. Only feasible for the
+    8-puzzle (9! boards).
+    """
+    table = np.full(factorial(size * size), unreachable, dtype=np.uint8)
+    frontier = [goal_tiles(size)]
+    table[rank(frontier[0])] = 0
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for tiles in frontier:
+            for _, board in moves(tiles, size):
+                index = rank(board)
+                if table[index] == unreachable:
+                    table[index] = depth
+                    next_frontier.append(board)
+        frontier = next_frontier
+    return table
+
+
+def build_pattern_database(size, pattern):
+    """
+    An additive pattern database for the tiles in ``pattern``.
+
+    The database holds the minimal number of moves of pattern tiles needed
+    to bring them to their goal positions, where the other tiles are
+    indistinguishable from each other. The empty cell is part of the
+    abstract state: a pattern tile can only move into the empty cell, and
+    moving the empty cell over the other tiles is free. As every move moves
+    a single tile and only the moves of pattern tiles are counted, the
+    values of disjoint patterns can be added up to an admissible heuristic.
+
+    The database is indexed by the positions ``p_i`` of the pattern tiles
+    and the position ``b`` of the empty cell as
+    ``sum(p_i * cells ** i) + b * cells ** k``, where ``cells = size * size``
+    and ``k = len(pattern)``.
+    """
+    cells = size * size
+    k = len(pattern)
+    weights = cells ** np.arange(k + 1, dtype=np.int64)
+    table = np.full(cells ** (k + 1), unreachable, dtype=np.uint8)
+
+    def expand(states):
+        """The states reached by moving the empty cell over other tiles, and by moving pattern tiles."""
+        positions = states[:, None] // weights % cells
+        blank = positions[:, k]
+        x, y = blank % size, blank // size
+        free, tile_moves = [], []
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            valid = (0 <= x + dx) & (x + dx < size) & (0 <= y + dy) & (y + dy < size)
+            target = blank + dy * size + dx
+            occupied = positions[:, :k] == target[:, None]
+            blocked = np.any(occupied, axis=1)
+            free.append(states[valid & ~blocked] + (dy * size + dx) * weights[k])
+            for i in range(k):
+                moved = valid & occupied[:, i]
+                tile_moves.append(states[moved] + (dy * size + dx) * (weights[k] - weights[i]))
+        return np.unique(np.concatenate(free)), np.unique(np.concatenate(tile_moves))
+
+    goal = int(sum((tile - 1) * weight for tile, weight in zip(pattern, weights.tolist())) + (cells - 1) * weights[k])
+    frontier = np.array([goal], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        table[frontier] = depth
+        layer, closure = [frontier], frontier
+        while closure.size:
+            closure, _ = expand(closure)
+            closure = closure[table[closure] == unreachable]
+            table[closure] = depth
+            layer.append(closure)
+        _, frontier = expand(np.concatenate(layer))
+        frontier = frontier[table[frontier] == unreachable]
+        depth += 1
+    return table
+
+
+def distance_table(size=3):
+    """The persisted table of ``build_distance_table``."""
+    return load_table(f"distances_{size}x{size}", lambda: build_distance_table(size))
+
+
+default_patterns = {
+    4: [(1, 2, 3, 4, 5), (6, 7, 8, 9, 10), (11, 12, 13, 14, 15)],
+}
+
+
+def pattern_databases(size=4, patterns=None):
+    """
+    The persisted additive pattern databases of ``build_pattern_database``
+    for disjoint ``patterns``, as a list of (pattern, database) tuples.
+    """
+    patterns = patterns or default_patterns[size]
+    return [
+        (pattern, load_table(f"pattern_blank_{size}x{size}_" + "-".join(map(str, pattern)),
+                             lambda pattern=pattern: build_pattern_database(size, pattern)))
+        for pattern in patterns
+    ]
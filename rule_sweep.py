@@ -0,0 +1,241 @@
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+from cycles import CycleDetector, ZobristHash
+
+
+def pack_words(cells):
+    """
+    Pack rows of 0/1 cells into 64-bit words, with cell ``i`` at bit
+    ``i % 64`` of word ``i // 64``.
+
+    Parameters
+    ----------
+    cells : np.ndarray
+        The cells as an array of shape (rows, width).
+
+    Returns
+    -------
+    np.ndarray
+        The words as a ``uint64`` array of shape (rows, ceil(width / 64)).
+    """
+    cells = np.asarray(cells, dtype=np.bool_)
+    rows, width = cells.shape
+    padded = np.zeros((rows, -(-width // 64) * 64), dtype=np.bool_)
+    padded[:, :width] = cells
+    return np.packbits(padded, axis=-1, bitorder="little").view("<u8").astype(np.uint64)
+
+
+def unpack_words(words, width):
+    """Unpack 64-bit words from ``pack_words`` into rows of ``width`` cells."""
+    data = np.ascontiguousarray(words, dtype="<u8").view(np.uint8)
+    return np.unpackbits(data, axis=-1, count=width, bitorder="little").astype(np.bool_)
+
+
+def popcount(words):
+    """The number of set bits of every row of words."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return np.unpackbits(words.view(np.uint8), axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def rule_masks(rules):
+    """
+    The rule tables as masks, an array of shape (8, rules, 1) holding all
+    ones where bit ``k`` of the rule is set and zeros elsewhere.
+    """
+    bits = (np.asarray(rules, dtype=np.uint64)[None, :] >> np.arange(8, dtype=np.uint64)[:, None]) & np.uint64(1)
+    return (np.uint64(0) - bits)[:, :, None]
+
+
+def step_words(words, masks, width):
+    """
+    Compute the next rows of a batch of elementary automata on rings of
+    ``width`` cells at once, each with its own rule.
+
+    This is the batched version of ``elementary.step_row``: every row is
+    packed into 64-bit words, and the rule is applied with bitwise logic on
+    whole words, selecting the configurations that lead to a live cell with
+    the masks of ``rule_masks``.
+
+    Parameters
+    ----------
+    words : np.ndarray
+        The rows as packed by ``pack_words``. Bits beyond ``width`` must be
+        zero.
+    masks : np.ndarray
+        The rules of the rows as returned by ``rule_masks``.
+    width : int
+        The number of cells in each row.
+
+    Returns
+    -------
+    np.ndarray
+        The next rows.
+    """
+    one, top = np.uint64(1), np.uint64(63)
+    last_bit = np.uint64((width - 1) % 64)
+
+    # The left neighbour of cell i is cell i - 1, the right one cell i + 1
+    left = words << one
+    left[:, 1:] |= words[:, :-1] >> top
+    left[:, 0] |= (words[:, -1] >> last_bit) & one
+    right = words >> one
+    right[:, :-1] |= words[:, 1:] << top
+    right[:, -1] |= (words[:, 0] & one) << last_bit
+
+    # Bit k of the rule is the new state of neighbourhoods reading k in binary
+    neighbours = [(~right, right), (~words, words), (~left, left)]
+    result = np.zeros_like(words)
+    for high in range(4):
+        pair = neighbours[2][high >> 1] & neighbours[1][high & 1]
+        for low in range(2):
+            k = high << 1 | low
+            result |= pair & neighbours[0][low] & masks[k]
+
+    # Clear the padding bits of the last word
+    if width % 64:
+        result[:, -1] &= (one << np.uint64(width % 64)) - one
+    return result
+
+
+def block_entropy(cells, block):
+    """
+    The Shannon entropy in bits of the blocks of ``block`` consecutive cells
+    (wrapping around) of every row of cells.
+    """
+    rows, width = cells.shape
+    values = np.zeros((rows, width), dtype=np.int64)
+    for offset in range(block):
+        values = values << 1 | np.roll(cells, -offset, axis=1)
+    counts = np.zeros((rows, 2 ** block), dtype=np.int64)
+    np.add.at(counts, (np.repeat(np.arange(rows), width), values.ravel()), 1)
+    probabilities = counts / width
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nansum(probabilities * np.log2(1 / probabilities), axis=1)
+
+
+def start_rows(start, rules, width, seed=0):
+    """
+    The start rows of a sweep.
+
+    ``start`` is either "single" for one live cell in the centre, "random"
+    for a different random row of density 0.5 per rule, a list of 0/1 cells
+    placed in the centre of every row, or an array of shape (rules, width).
+    """
+    if isinstance(start, str) and start == "single":
+        cells = np.zeros((rules, width), dtype=np.bool_)
+        cells[:, width // 2] = True
+        return cells
+    if isinstance(start, str) and start == "random":
+        return np.random.default_rng(seed).random((rules, width)) < 0.5
+    start = np.asarray(start, dtype=np.bool_)
+    if start.ndim == 2:
+        return start
+    cells = np.zeros((rules, width), dtype=np.bool_)
+    offset = (width - len(start)) // 2
+    cells[:, offset:offset + len(start)] = start
+    return cells
+
+
+def sweep(rules=range(256), width=10_000, generations=10_000, start="single", block=4, window=100, seed=0):
+    """
+    Evolve elementary automata with many rules at once and collect
+    statistics of every rule.
+
+    All rules are stepped together with ``step_words``, so a generation of
+    the whole sweep takes a few dozen NumPy operations. Fixed points and
+    cycles are detected from the hash of every row, as in ``runner.run``.
+
+    Parameters
+    ----------
+    rules : iterable(int), optional
+        The rules to evolve. Default is all 256 rules.
+    width : int, optional
+        The number of cells of every row. Default is 10 000.
+    generations : int, optional
+        The number of generations. Default is 10 000.
+    start : str, list or np.ndarray, optional
+        The start rows, see ``start_rows``. Default is "single".
+    block : int, optional
+        The block size of the block entropy. Default is 4.
+    window : int, optional
+        The number of final generations the density is averaged over.
+        Default is 100.
+    seed : int, optional
+        The seed of random start rows. Default is 0.
+
+    Returns
+    -------
+    list(dict)
+        One row of statistics per rule: the mean ``density`` of the last
+        ``window`` generations, the ``entropy`` of the blocks of the final
+        row, and the ``transient`` and ``period`` of the cycle the rule ends
+        in (None if it did not repeat within ``generations``).
+    """
+    rules = list(rules)
+    words = pack_words(start_rows(start, len(rules), width, seed))
+    masks = rule_masks(rules)
+
+    hasher = ZobristHash(words.shape[1])
+    positions = np.arange(words.shape[1])
+    detectors = [CycleDetector(history=generations + 1) for _ in rules]
+    pending = list(range(len(rules)))
+
+    live = np.zeros(len(rules), dtype=np.int64)
+    window = min(window, generations)
+    for generation in range(generations + 1):
+        if generation:
+            words = step_words(words, masks, width)
+        if generation > generations - window:
+            live += popcount(words)
+
+        if pending:
+            hashes = np.bitwise_xor.reduce(hasher.contributions(positions, words[pending]), axis=1)
+            pending = [
+                index for index, value in zip(pending, hashes.tolist())
+                if detectors[index].observe(generation, value) is None
+            ]
+
+    entropy = block_entropy(unpack_words(words, width), block)
+    return [
+        {
+            "rule": rule,
+            "density": float(live[index] / (max(window, 1) * width)),
+            "entropy": float(entropy[index]),
+            "transient": detectors[index].start,
+            "period": detectors[index].period,
+        }
+        for index, rule in enumerate(rules)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evolve many elementary rules at once and collect statistics.")
+    parser.add_argument("--rules", type=int, nargs="+", default=list(range(256)))
+    parser.add_argument("--width", type=int, default=10_000)
+    parser.add_argument("--generations", type=int, default=10_000)
+    parser.add_argument("--start", default="single", help='"single", "random" or a pattern like 1011')
+    parser.add_argument("--block", type=int, default=4, help="block size of the block entropy")
+    parser.add_argument("--window", type=int, default=100, help="generations to average the density over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the table to this CSV file")
+    args = parser.parse_args()
+
+    start = args.start if args.start in ("single", "random") else [int(cell) for cell in args.start]
+    begin = time.perf_counter()
+    table = sweep(args.rules, args.width, args.generations, start, args.block, args.window, args.seed)
+    elapsed = time.perf_counter() - begin
+
+    columns = ["rule", "density", "entropy", "transient", "period"]
+    f = open(args.output, "w", newline="") if args.output else sys.stdout
+    writer = csv.DictWriter(f, columns)
+    writer.writeheader()
+    writer.writerows(table)
+    if args.output:
+        f.close()
+    print(f"{len(table)} rules x {args.width} cells x {args.generations} generations in {elapsed:.1f} s", file=sys.stderr)
@@ -0,0 +1,168 @@
+import argparse
+import time
+
+from checkpoint import Checkpointer
+from chou_reggia_loops import ChouReggiaLoops
+from conway import GameOfLife
+from cycles import CycleDetector
+from elementary import ElementaryCellularAutomaton
+from floating_conway import FloatingConway
+from grid import Neighbourhood, NeighbourhoodType
+from langton_loops import LangtonLoops
+from patterns import load_pattern
+from rules import LifeLike
+from sparse_life import SparseGameOfLife
+
+
+def run(automaton, generations, every=1, detector=None, on_cycle="report", tolerance=None,
+        start=0, checkpointer=None):
+    """
+    Advance a headless automaton as fast as possible.
+
+    With a ``detector``, the hash of every generation (``state_hash``) is
+    checked for repetitions, so fixed points and oscillators are found as
+    soon as they repeat.
+
+    Parameters
+    ----------
+    automaton : Container
+        The automaton to run, created with ``headless=True``. If it has a
+        ``gif_path``, its frames are rendered into the gif as it runs.
+    generations : int
+        The number of generations to compute.
+    every : int, optional
+        Yield only every ``every``-th generation. Default is 1.
+    detector : CycleDetector, optional
+        The detector to record the hashes in. Its ``start`` and ``period``
+        hold the detected cycle. Default is None, which disables detection.
+    on_cycle : str, optional
+        What to do once a cycle is detected: "report" keeps running, "stop"
+        yields the current generation and stops, and "fast-forward" skips
+        as many whole periods as fit into the remaining generations, which
+        are not yielded. Default is "report".
+    tolerance : float, optional
+        Treat the automaton as converged to a fixed point once no cell
+        changed by more than ``tolerance`` in a step (``last_change``), e.g.
+        for the activations of ``FloatingConway``, which only decay towards
+        a fixed point. Default is None, which only detects exact cycles.
+    start : int, optional
+        The generation the automaton is at, e.g. after resuming from a
+        checkpoint. The run continues up to generation ``generations``.
+        Default is 0.
+    checkpointer : Checkpointer, optional
+        Saves a checkpoint every ``checkpointer.every`` generations.
+        Default is None.
+
+    Yields
+    ------
+    tuple(int, object)
+        The generation number and a snapshot of the automaton's state.
+
+    Example
+    -------
+    >>> life = GameOfLife(rows=100, cols=100, vectorized=True, headless=True)
+    >>> for generation, states in run(life, 1000, every=100):
+    >>>     print(generation, states.sum())
+    """
+    if detector is not None:
+        detector.observe(start, automaton.state_hash())
+
+    profiler = automaton.profiler
+    generation = start
+    while generation < generations:
+        profiler.begin_frame()
+        with profiler.phase("capture"):
+            automaton.record_frame()
+        automaton.step()
+        profiler.end_frame()
+        generation += 1
+
+        if checkpointer is not None and generation % checkpointer.every == 0:
+            checkpointer.save(automaton, generation)
+
+        if detector is not None and detector.period is None:
+            period = detector.observe(generation, automaton.state_hash())
+            if period is None and tolerance is not None and automaton.last_change is not None \
+                    and automaton.last_change <= tolerance:
+                period = detector.converged(generation)
+            if period is not None and on_cycle == "stop":
+                yield generation, automaton.snapshot()
+                return
+            if period is not None and on_cycle == "fast-forward":
+                generation += (generations - generation) // period * period
+
+        if generation % every == 0:
+            yield generation, automaton.snapshot()
+
+
+def options(args):
+    return dict(headless=True, gif_path=args.gif, gif_length=args.generations, profile=bool(args.profile))
+
+
+def grid_options(args):
+    return dict(rows=args.rows, cols=args.cols, vectorized=args.vectorized, workers=args.workers,
+                tabulated=args.tabulated, **options(args))
+
+
+automata = {
+    "conway": lambda args: GameOfLife(**grid_options(args)),
+    "floating": lambda args: FloatingConway(FloatingConway.pattern1, **grid_options(args)),
+    "langton": lambda args: LangtonLoops(**grid_options(args)),
+    "chou-reggia": lambda args: ChouReggiaLoops(**grid_options(args)),
+    "life-like": lambda args: LifeLike(
+        args.rulestring, Neighbourhood(NeighbourhoodType[args.neighbourhood.upper()], args.radius),
+        **dict(grid_options(args), vectorized=True)),
+    "sparse": lambda args: SparseGameOfLife(width=5 * args.cols, height=5 * args.rows, **options(args)),
+    "elementary": lambda args: ElementaryCellularAutomaton(
+        width=args.cols, cols=args.cols, rule=args.rule, history_path=args.spacetime, **options(args)),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an automaton without a window.")
+    parser.add_argument("automaton", choices=automata)
+    parser.add_argument("--generations", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--cols", type=int, default=100)
+    parser.add_argument("--rule", type=int, default=22, help="rule of the elementary automaton")
+    parser.add_argument("--rulestring", default="B3/S23", help="rule of the life-like automaton, e.g. B36/S23 or B2/S/C3")
+    parser.add_argument("--neighbourhood", choices=["moore", "von_neumann"], default="moore",
+                        help="neighbourhood of the life-like automaton")
+    parser.add_argument("--radius", type=int, default=1, help="neighbourhood radius of the life-like automaton")
+    parser.add_argument("--spacetime", help="write every row of the elementary automaton to this file")
+    parser.add_argument("--every", type=int, default=100, help="report every n-th generation")
+    parser.add_argument("--vectorized", action="store_true", help="use the array-backed engine")
+    parser.add_argument("--tabulated", action="store_true", help="step the rules of the cells with a cached lookup table")
+    parser.add_argument("--workers", type=int, help="step the array-backed engine on this many processes")
+    parser.add_argument("--gif", help="render the run into a gif at this path")
+    parser.add_argument("--on-cycle", choices=["report", "stop", "fast-forward"],
+                        help="detect fixed points and cycles and report them, stop or skip ahead")
+    parser.add_argument("--history", type=int, default=1000, help="longest period to detect")
+    parser.add_argument("--tolerance", type=float, help="treat changes up to this size as converged")
+    parser.add_argument("--profile", help="write the timings of every generation to this JSON or CSV file")
+    parser.add_argument("--pattern", help="RLE pattern to place at the centre of the grid")
+    parser.add_argument("--checkpoints", help="directory to save checkpoints to and resume from")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="save a checkpoint every n-th generation")
+    args = parser.parse_args()
+
+    automaton = automata[args.automaton](args)
+    if args.pattern:
+        load_pattern(automaton, args.pattern)
+
+    checkpointer = Checkpointer(args.checkpoints, args.checkpoint_every) if args.checkpoints else None
+    first = checkpointer.resume(automaton) if checkpointer else 0
+    if first:
+        print(f"resuming from generation {first}")
+
+    detector = CycleDetector(args.history) if args.on_cycle else None
+    start = time.perf_counter()
+    runs = run(automaton, args.generations, args.every, detector, args.on_cycle, args.tolerance, first, checkpointer)
+    for generation, _ in runs:
+        elapsed = time.perf_counter() - start
+        print(f"generation {generation}: {(generation - first) / elapsed:.1f} generations/s")
+    automaton.shutdown()
+    if args.profile:
+        automaton.profiler.export(args.profile)
+
+    if detector is not None and detector.period is not None:
+        print(f"cycle of period {detector.period} from generation {detector.start}")
@@ -0,0 +1,146 @@
+import struct
+
+import numpy as np
+
+
+def row_bytes(width):
+    """The number of bytes of a bit-packed row of ``width`` cells."""
+    return (width + 7) // 8
+
+
+def unpack_rows(rows, width):
+    """Unpack bit-packed rows into a boolean array of shape (rows, width)."""
+    return np.unpackbits(rows, axis=-1, count=width, bitorder="little").astype(np.bool_)
+
+
+class RowRing:
+    """
+    A fixed-size ring buffer of bit-packed rows, holding the last
+    ``capacity`` rows of a spacetime diagram.
+
+    Appending a row overwrites the oldest one once the buffer is full, so no
+    memory is allocated or moved while running.
+    """
+    def __init__(self, capacity, width):
+        self.width = width
+        self.buffer = np.zeros((capacity, row_bytes(width)), dtype=np.uint8)
+        self.start = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def reset(self, bits):
+        """Drop all rows and start over with the row ``bits``."""
+        self.start = 0
+        self.count = 0
+        self.append(bits)
+
+    def append(self, bits):
+        """Append a row, given as an integer with cell ``i`` at bit ``i``."""
+        capacity = len(self.buffer)
+        index = (self.start + self.count) % capacity
+        self.buffer[index] = np.frombuffer(bits.to_bytes(self.buffer.shape[1], "little"), dtype=np.uint8)
+        if self.count < capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % capacity
+
+    def packed(self):
+        """The bit-packed rows, oldest first."""
+        index = (self.start + np.arange(self.count)) % len(self.buffer)
+        return self.buffer[index]
+
+    def cells(self):
+        """The rows as a boolean array of shape (rows, width), oldest first."""
+        return unpack_rows(self.packed(), self.width)
+
+    def __iter__(self):
+        """The rows as integers, oldest first."""
+        return (int.from_bytes(row.tobytes(), "little") for row in self.packed())
+
+
+class SpacetimeFile:
+    """
+    An append-only file with the full spacetime diagram of an elementary
+    automaton.
+
+    The file has a 32 byte header with the magic bytes ``MLST``, the format
+    version, the width, the rule and the generation of the first row, all
+    little-endian. The rows follow bit-packed, each padded to whole bytes,
+    so every generation takes ``width / 8`` bytes. Rows are written through
+    a buffered file and can be read back as slices of a memory map without
+    loading the whole file.
+
+    Example
+    -------
+    >>> automaton = ElementaryCellularAutomaton(rule=30, history_path="rule30.st", headless=True)
+    >>> for _ in range(1_000_000):
+    >>>     automaton.step()
+    >>> automaton.shutdown()
+    >>> SpacetimeFile("rule30.st").rows(5000, 5100)
+    """
+    magic = b"MLST"
+    version = 1
+    header = struct.Struct("<4sIQIQ")
+    header_size = 32
+
+    def __init__(self, path, mode="r", width=None, rule=None, generation=0):
+        self.path = path
+        self.mode = mode
+        if mode == "w":
+            self.width, self.rule, self.generation = width, rule, generation
+            self.file = open(path, "wb")
+            self.file.write(self.header.pack(self.magic, self.version, width, rule, generation)
+                            .ljust(self.header_size, b"\0"))
+        elif mode == "r":
+            with open(path, "rb") as f:
+                magic, version, self.width, self.rule, self.generation = self.header.unpack(
+                    f.read(self.header_size)[:self.header.size])
+            if magic != self.magic:
+                raise ValueError(f"{path} is not a spacetime file")
+            if version != self.version:
+                raise ValueError(f"Unsupported spacetime file version {version}")
+            self.file = None
+        else:
+            raise ValueError(f"Unknown mode {mode!r}")
+        self.stride = row_bytes(self.width)
+
+    def append(self, bits):
+        """Append a row, given as an integer with cell ``i`` at bit ``i``."""
+        self.file.write(bits.to_bytes(self.stride, "little"))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __len__(self):
+        if self.file is not None:
+            self.file.flush()
+        with open(self.path, "rb") as f:
+            f.seek(0, 2)
+            return (f.tell() - self.header_size) // self.stride
+
+    def packed(self):
+        """A read-only memory map of all bit-packed rows."""
+        if len(self) == 0:
+            return np.zeros((0, self.stride), dtype=np.uint8)
+        return np.memmap(self.path, dtype=np.uint8, mode="r", offset=self.header_size,
+                         shape=(len(self), self.stride))
+
+    def rows(self, start=None, stop=None):
+        """
+        The rows from generation ``start`` up to ``stop`` as a boolean array
+        of shape (rows, width). Only these rows are read from disk.
+        """
+        first = self.generation
+        start = first if start is None else start
+        stop = first + len(self) if stop is None else stop
+        return unpack_rows(np.asarray(self.packed()[start - first:stop - first]), self.width)
@@ -0,0 +1,31 @@
+import os
+
+import numpy as np
+
+
+table_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tables")
+
+
+def save_table(path, table):
+    """
+    Save a table as ``.npy`` file. The table is written to a temporary file
+    first and then renamed, so an interrupted save never leaves a broken
+    table behind, and processes building the same table at once do not
+    overwrite each other's partial files.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        np.save(f, table)
+    os.replace(temporary, path)
+
+
+def load_table(name, build):
+    """
+    Load a table from the ``tables`` directory as a read-only memory map,
+    building and saving it with ``build()`` if it does not exist yet.
+    """
+    path = os.path.join(table_dir, f"{name}.npy")
+    if not os.path.exists(path):
+        os.makedirs(table_dir, exist_ok=True)
+        save_table(path, build())
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,228 @@
+import hashlib
+import inspect
+from itertools import product
+
+import numpy as np
+
+from table_cache import load_table
+
+
+max_states = 256
+max_configurations = 2 ** 20
+
+
+def source_hash(cell_type):
+    """
+    A hash of a cell type and its base classes, so a cached table is
+    rebuilt whenever the rules are edited: the source code of every class,
+    where available, and its attributes other than methods. The attributes
+    tell apart the classes created at runtime (e.g. by
+    ``LifeLikeCell.configure``), which share the name, and therefore the
+    source found by ``inspect``, of their base class.
+    """
+    digest = hashlib.sha256()
+    for cls in cell_type.__mro__[:-1]:
+        try:
+            digest.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            pass
+        attributes = sorted(
+            (name, repr(value)) for name, value in vars(cls).items()
+            if not name.startswith("__") and not inspect.isroutine(value)
+            and not isinstance(value, (classmethod, staticmethod, property))
+        )
+        digest.update(repr(attributes).encode())
+    return digest.hexdigest()
+
+
+def activation_states(cell_type):
+    """The states of a default cell and of the cells reached from it by ``activate``."""
+    states, cell = [], cell_type()
+    while cell.to_state() not in states and len(states) <= max_states:
+        states.append(cell.to_state())
+        try:
+            cell = cell.activate()
+        except NotImplementedError:
+            break
+    return states
+
+
+def enumerate_rule(cell_type, neighbourhood, states):
+    """
+    Call ``update`` for every configuration of a cell and its neighbours
+    over ``states``.
+
+    Returns
+    -------
+    tuple(list, list)
+        The next state of every configuration, in the order of
+        ``table_index``, and the states that are not in ``states``.
+    """
+    cells = [cell_type.from_state(state) for state in states]
+    offsets = neighbourhood.offsets()
+    results, unknown = [], []
+    for centre, *neighbours in product(cells, repeat=len(offsets) + 1):
+        if neighbourhood.positional:
+            neighbours = list(zip(neighbours, offsets))
+        state = centre.update(neighbours).to_state()
+        results.append(state)
+        if state not in states and state not in unknown:
+            unknown.append(state)
+    return results, unknown
+
+
+def build_table(cell_type, neighbourhood, states=None):
+    """
+    Enumerate the rule of a cell type with a small finite set of states
+    into a lookup table.
+
+    Parameters
+    ----------
+    cell_type : GridCell
+        The cell type, which must implement ``update`` and ``to_state``,
+        and whose ``update`` may only depend on the states of the cell and
+        its neighbours.
+    neighbourhood : Neighbourhood
+        The neighbourhood of the automaton.
+    states : list, optional
+        The states a cell can be in. Default is None, which starts from the
+        states reached by ``activate`` and adds the states produced by
+        ``update`` until no new states appear.
+
+    Returns
+    -------
+    tuple(np.ndarray, np.ndarray)
+        The sorted states and the table of the index of the next state for
+        every configuration, indexed by ``table_index``.
+    """
+    states = sorted(states if states is not None else activation_states(cell_type))
+    while True:
+        size = len(states) ** (len(neighbourhood.offsets()) + 1)
+        if len(states) > max_states or size > max_configurations:
+            raise ValueError(f"{cell_type.__name__} has too many configurations to tabulate "
+                             f"({len(states)} states over {len(neighbourhood.offsets())} neighbours)")
+        results, unknown = enumerate_rule(cell_type, neighbourhood, states)
+        if not unknown:
+            break
+        states = sorted(states + unknown)
+
+    codes = {state: code for code, state in enumerate(states)}
+    return np.array(states), np.array([codes[state] for state in results], dtype=np.uint8)
+
+
+def table_index(codes, neighbourhood, base, out):
+    """
+    The index into a table from ``build_table`` for every cell of a toroidal
+    grid of state codes: the codes of the cell and of its neighbours (in the
+    order of ``neighbourhood.offsets()``) read as a base ``base`` number.
+    """
+    out[...] = codes
+    for offset in neighbourhood.offsets():
+        out *= base
+        neighbourhood.add_shifted(out, codes, offset)
+    return out
+
+
+def outer_totalistic(table, neighbours):
+    """
+    The birth and survival counts of a two-state table from ``build_table``
+    if the next state only depends on the state of the cell and the number
+    of living neighbours, as in the Game of Life, otherwise None.
+    """
+    configurations = np.arange(2 ** neighbours)
+    counts = sum(configurations >> bit & 1 for bit in range(neighbours))
+    rule = []
+    for row in table.reshape(2, -1):
+        states = [np.unique(row[counts == count]) for count in range(neighbours + 1)]
+        if any(len(values) > 1 for values in states):
+            return None
+        rule.append(tuple(count for count, values in enumerate(states) if values[0]))
+    return tuple(rule)
+
+
+def tabulate(cell_type, neighbourhood, states=None):
+    """
+    A cell type that steps an array-backed grid with a lookup table of the
+    rule of ``cell_type`` instead of calling ``update`` for every cell.
+
+    The table is built by ``build_table`` and cached in the ``tables``
+    directory (see ``table_cache.load_table``), keyed by the
+    ``source_hash`` of the cell type and the neighbourhood, so it is only
+    rebuilt when the rules change. A generation then costs one table
+    lookup and a few array operations per neighbour, as for hand-written
+    kernels like ``LangtonCell.step_states``. Two-state rules that only
+    count the living neighbours are recognized (see ``outer_totalistic``)
+    and stepped like the life-like rules of ``rules.LifeLikeCell``, which
+    is as fast as ``ConwayCell``.
+
+    The returned cell type is a subclass of ``cell_type`` marked as
+    ``tabulated``, which keeps ``states`` as ``tabulated_states``, so it
+    can be recreated in other processes (see ``parallel.cell_type_spec``).
+
+    Example
+    -------
+    >>> life = GridAutomaton(tabulate(MyCell, neighbourhood), neighbourhood, vectorized=True)
+    """
+    neighbourhood_key = f"{neighbourhood.type.name.lower()}{neighbourhood.radius}{'p' if neighbourhood.positional else ''}"
+    name = f"rule_{cell_type.__name__}_{neighbourhood_key}_{source_hash(cell_type)[:16]}"
+    if states is not None:
+        name += "_" + hashlib.sha256(repr(sorted(states)).encode()).hexdigest()[:8]
+    built = []
+
+    def build(part):
+        if not built:
+            built.extend(build_table(cell_type, neighbourhood, states))
+        return built[part]
+
+    values = np.array(load_table(f"{name}_states", lambda: build(0)))
+    table = np.array(load_table(name, lambda: build(1)))
+
+    if cell_type.dtype is not None:
+        dtype = np.dtype(cell_type.dtype)
+    elif values.dtype == np.bool_ or np.issubdtype(values.dtype, np.integer) and values.min() >= 0 and values.max() < 256:
+        dtype = np.dtype(np.bool_ if values.dtype == np.bool_ else np.uint8)
+    else:
+        dtype = values.dtype
+    values = values.astype(dtype)
+    base = len(values)
+    index_type = np.uint16 if table.size <= 2 ** 16 else np.uint32
+    # States 0, 1, ... are their own codes and need no translation
+    identity = np.array_equal(values, np.arange(base))
+    lookup = values[table] if identity else table
+
+    neighbours = len(neighbourhood.offsets())
+    rule = None
+    if base == 2 and identity and not neighbourhood.positional:
+        rule = outer_totalistic(table, neighbours)
+    if rule is not None:
+        # Imported here, as rules imports grid, which imports this module
+        from rules import LifeLikeCell, index_dtype, transition_runs, transition_table
+        birth, survival = rule
+        table = transition_table(birth, survival, 2, neighbours)
+        runs = transition_runs(birth, survival, 2, neighbours)
+        index_type = index_dtype(table.size)
+
+    def step_states(cls, states, neighbourhood, out=None):
+        if out is None:
+            out = np.empty_like(states)
+        if rule is not None:
+            index = neighbourhood.buffer("index", states.shape, index_type)
+            neighbourhood.sum(states, out=index, centre=neighbours + 1)
+            return LifeLikeCell.look_up(index, runs, table, neighbourhood, out)
+        codes = states
+        if not identity:
+            codes = neighbourhood.buffer("codes", states.shape, np.uint8)
+            codes[...] = np.searchsorted(values, states)
+        index = table_index(codes, neighbourhood, base, out=neighbourhood.buffer("index", states.shape, index_type))
+        if identity:
+            return np.take(lookup, index, out=out, mode="clip")
+        return np.take(values, np.take(lookup, index, mode="clip"), out=out)
+
+    return type(cell_type.__name__, (cell_type,), {
+        "__slots__": (),
+        "dtype": dtype.type,
+        "step_states": classmethod(step_states),
+        "tabulated": True,
+        "tabulated_states": states,
+    })
+
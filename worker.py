@@ -0,0 +1,129 @@
+import queue
+import threading
+
+
+class SimulationWorker:
+    """
+    Advances an automaton on a background thread, decoupled from the Tk
+    render loop.
+
+    The worker steps the automaton and publishes every ``every``-th
+    generation as a frame (``automaton.frame_state()``) into a bounded
+    queue, from which the render loop takes frames at its own rate:
+
+    - By default, the render loop shows the frames one after the other, and
+      the worker waits while the queue is full, so no generation is skipped
+      and the worker stays at most ``maxsize`` frames ahead.
+    - With ``fast=True``, the worker never waits. It drops the oldest frame
+      when the queue is full, and the render loop always shows the latest
+      frame, so the simulation runs as fast as possible.
+
+    The automaton is only touched by the worker thread. User edits are
+    passed in with ``submit`` and applied between two steps, so they never
+    race with a step.
+
+    Parameters
+    ----------
+    automaton : Container
+        The automaton to advance with ``step``. It is paused while its
+        ``running`` attribute is False.
+    every : int, optional
+        Publish only every ``every``-th generation. Default is 1.
+    fast : bool, optional
+        Whether to run as fast as possible. Default is False.
+    maxsize : int, optional
+        The number of frames the queue holds. Default is 8.
+    """
+    def __init__(self, automaton, every=1, fast=False, maxsize=8):
+        self.automaton = automaton
+        self.every = every
+        self.fast = fast
+        self.frames = queue.Queue(maxsize)
+        self.edits = queue.SimpleQueue()
+        self.stopped = threading.Event()
+        self.generation = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        """Stop the worker and wait for the current step to finish."""
+        self.stopped.set()
+        self.thread.join()
+
+    def submit(self, edit):
+        """Apply ``edit()`` to the automaton between two steps."""
+        self.edits.put(edit)
+
+    def apply_edits(self, timeout=None):
+        """
+        Apply the pending edits. With a ``timeout``, wait that long for an
+        edit if there is none.
+
+        Returns
+        -------
+        bool
+            Whether any edit was applied.
+        """
+        try:
+            edit = self.edits.get(timeout=timeout) if timeout else self.edits.get_nowait()
+        except queue.Empty:
+            return False
+        edit()
+        while True:
+            try:
+                self.edits.get_nowait()()
+            except queue.Empty:
+                return True
+
+    def run(self):
+        self.publish()
+        while not self.stopped.is_set():
+            if not self.automaton.running:
+                # Show edits while paused
+                if self.apply_edits(timeout=0.05):
+                    self.publish()
+                continue
+
+            edited = self.apply_edits()
+            self.automaton.step()
+            self.generation += 1
+            if edited or self.generation % self.every == 0:
+                self.publish()
+
+    def publish(self):
+        """Put the current generation into the queue of frames."""
+        self.automaton.record_frame()
+        frame = (self.generation, self.automaton.frame_state())
+        if self.fast:
+            while True:
+                try:
+                    self.frames.put_nowait(frame)
+                    return
+                except queue.Full:
+                    # Drop the oldest frame, the render loop may have taken it meanwhile
+                    try:
+                        self.frames.get_nowait()
+                    except queue.Empty:
+                        pass
+        while not self.stopped.is_set():
+            try:
+                self.frames.put(frame, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    def latest(self):
+        """
+        The next frame to show as a tuple of (generation, state), or None
+        if there is no new frame. In fast mode, older frames are skipped.
+        """
+        frame = None
+        while True:
+            try:
+                frame = self.frames.get_nowait()
+            except queue.Empty:
+                return frame
+            if not self.fast:
+                return frame